@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Delete, Select
+
+from config import ACTIVE_EVENTS_SWEEP_INTERVAL
+from database import AsyncSessionLocal
+from models import ActiveEvent, Event, User, event_participants
+
+logger = logging.getLogger('backend_main_logger')
+
+PROJECTED_COLUMNS = (
+    'place_id',
+    'user_id',
+    'telegram_username',
+    'name',
+    'description',
+    'comment',
+    'start_datetime',
+    'end_datetime',
+    'participants_count',
+)
+
+
+def active_events_source(event_ids: Optional[Iterable[int]] = None) -> Select:
+    """Строки проекции, посчитанные из таблиц events и event_participants."""
+    participants_count = (
+        select(func.count())
+        .select_from(event_participants)
+        .filter(event_participants.c.event_id == Event.id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            Event.id, Event.place_id, Event.user_id, User.telegram_username,
+            Event.name, Event.description, Event.comment,
+            Event.start_datetime, Event.end_datetime, participants_count)
+        .join(User, User.telegram_id == Event.user_id)
+        .filter(Event.end_datetime > datetime.now())
+    )
+    if event_ids is not None:
+        statement = statement.filter(Event.id.in_(list(event_ids)))
+    return statement
+
+
+async def refresh_active_events(
+        db: AsyncSession,
+        event_ids: Optional[Iterable[int]] = None) -> None:
+    """Добавление или пересчет событий в проекции в текущей транзакции."""
+    statement = insert(ActiveEvent).from_select(
+        ['event_id', *PROJECTED_COLUMNS], active_events_source(event_ids))
+    statement = statement.on_conflict_do_update(
+        index_elements=[ActiveEvent.event_id],
+        set_={column: statement.excluded[column]
+              for column in PROJECTED_COLUMNS})
+    await db.execute(statement)
+
+
+async def add_participants(db: AsyncSession, event_ids: list[int]) -> None:
+    """Увеличение числа участников событий на одного."""
+    if event_ids:
+        await db.execute(
+            update(ActiveEvent)
+            .filter(ActiveEvent.event_id.in_(event_ids))
+            .values(participants_count=ActiveEvent.participants_count + 1))
+
+
+async def rename_organizer(
+        db: AsyncSession,
+        telegram_id: str,
+        telegram_username: Optional[str]) -> None:
+    """Обновление имени организатора во всех его событиях."""
+    await db.execute(
+        update(ActiveEvent)
+        .filter(ActiveEvent.user_id == telegram_id)
+        .values(telegram_username=telegram_username))
+
+
+def expired_events_query() -> Delete:
+    """Запрос удаления завершившихся событий из проекции."""
+    return delete(ActiveEvent).filter(
+        ActiveEvent.end_datetime <= datetime.now())
+
+
+async def sweep_expired(db: AsyncSession) -> int:
+    """Удаление завершившихся событий из проекции."""
+    result = await db.execute(expired_events_query())
+    return result.rowcount
+
+
+async def sweep_active_events() -> int:
+    """Очистка проекции в отдельной сессии."""
+    async with AsyncSessionLocal() as db:
+        removed = await sweep_expired(db)
+        await db.commit()
+    return removed
+
+
+async def run_sweeper() -> None:
+    """Периодическая очистка проекции, запускается в lifespan."""
+    while True:
+        await asyncio.sleep(ACTIVE_EVENTS_SWEEP_INTERVAL)
+        try:
+            removed = await sweep_active_events()
+            if removed:
+                logger.info(f'Из active_events удалено событий: {removed}')
+        except Exception as e:
+            # Ошибки соединения asyncpg не оборачиваются в SQLAlchemyError,
+            # а очистка должна пережить перезапуск базы.
+            logger.error(f'Ошибка при очистке active_events: {str(e)}')
+
+
+async def rebuild_active_events() -> int:
+    """Пересборка проекции с нуля в одной транзакции.
+
+    Таблица блокируется на время пересборки, поэтому изменения
+    участников из параллельных запросов применяются уже к новым строкам.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(
+            f'LOCK TABLE {ActiveEvent.__tablename__} IN EXCLUSIVE MODE'))
+        await db.execute(delete(ActiveEvent))
+        await refresh_active_events(db)
+        count = (await db.execute(
+            select(func.count()).select_from(ActiveEvent))).scalar_one()
+        await db.commit()
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Обслуживание проекции active_events.')
+    parser.add_argument(
+        'command', choices=['rebuild', 'sweep'],
+        help='rebuild - пересобрать с нуля, sweep - удалить завершившиеся')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        print(f'Активных событий: {asyncio.run(rebuild_active_events())}')
+    else:
+        print(f'Удалено событий: {asyncio.run(sweep_active_events())}')
@@ -0,0 +1,130 @@
+"""Локальная замена overpass-api.de и Nominatim для нагрузочных тестов.
+
+Отдает записанные ответы из benchmarks/fixtures с заданной задержкой.
+Запросы overpass разбираются настолько, насколько их строит
+get_osm_response: узлы по id, круг around и прямоугольник с названием.
+Запуск отдельно из каталога backend:
+    python -m benchmarks.fake_osm --port 8081 --latency 50
+и OVERPASS_URL=http://127.0.0.1:8081/api/interpreter,
+NOMINATIM_URL=http://127.0.0.1:8081/search для приложения.
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import ORJSONResponse
+
+from geo import get_distance
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+ID_PATTERN = re.compile(r'node\(id:([\d,\s]+)\)')
+AROUND_PATTERN = re.compile(r'around:(\d+),([-\d.]+),([-\d.]+)')
+BBOX_PATTERN = re.compile(r'\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)')
+NAME_PATTERN = re.compile(r'\["name"="(.*?)"\]')
+LIMIT_PATTERN = re.compile(r'out (\d+);')
+
+
+def load_fixture(name: str):
+    """Записанный ответ из каталога fixtures."""
+    with open(FIXTURES_DIR / name, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def filter_elements(elements: list[dict], data: str) -> list[dict]:
+    """Узлы, которые вернул бы overpass-api.de на запрос data."""
+    match = ID_PATTERN.search(data)
+    if match:
+        ids = {int(place_id) for place_id in match.group(1).split(',')}
+        return [element for element in elements if element['id'] in ids]
+
+    match = AROUND_PATTERN.search(data)
+    if match:
+        around, latitude, longitude = map(float, match.groups())
+        return [
+            element for element in elements
+            if get_distance(
+                latitude, longitude,
+                element['lat'], element['lon']) <= around]
+
+    match = BBOX_PATTERN.search(data)
+    if match:
+        south, west, north, east = map(float, match.groups())
+        elements = [
+            element for element in elements
+            if south <= element['lat'] <= north
+            and west <= element['lon'] <= east]
+    match = NAME_PATTERN.search(data)
+    if match:
+        elements = [
+            element for element in elements
+            if element['tags'].get('name') == match.group(1)]
+    match = LIMIT_PATTERN.search(data)
+    if match:
+        elements = elements[:int(match.group(1))]
+    return elements
+
+
+def create_app(latency: float = 0.0) -> FastAPI:
+    """Приложение с ответами overpass и Nominatim и задержкой в секундах."""
+    overpass = load_fixture('overpass.json')
+    nominatim = load_fixture('nominatim.json')
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.state.latency = latency
+    app.state.requests = 0
+
+    @app.get('/api/interpreter')
+    async def interpreter(data: str = Query(...)):
+        app.state.requests += 1
+        await asyncio.sleep(app.state.latency)
+        return {
+            **overpass,
+            'elements': filter_elements(overpass['elements'], data)}
+
+    @app.get('/search')
+    async def search(q: str = Query(...)):
+        app.state.requests += 1
+        await asyncio.sleep(app.state.latency)
+        return nominatim
+
+    return app
+
+
+class FakeOsmServer:
+    """Сервер uvicorn с заменой OSM в отдельном потоке."""
+
+    def __init__(self, port: int, latency: float = 0.0):
+        self.port = port
+        self.app = create_app(latency)
+        self.server = uvicorn.Server(uvicorn.Config(
+            self.app, host='127.0.0.1', port=port, log_level='warning'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self) -> None:
+        """Запуск сервера и ожидание готовности."""
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError('Не удалось запустить замену OSM')
+            self.thread.join(0.01)
+
+    def stop(self) -> None:
+        """Остановка сервера."""
+        self.server.should_exit = True
+        self.thread.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Замена overpass-api.de и Nominatim.')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument(
+        '--latency', type=float, default=0, help='Задержка ответа, мс')
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency / 1000), host='127.0.0.1', port=args.port)
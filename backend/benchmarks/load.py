@@ -0,0 +1,321 @@
+"""Нагрузочный тест API с локальными заменами overpass-api.de и Nominatim.
+
+Приложение запускается в этом же процессе вместе со своим lifespan,
+запросы к OSM уходят по http в benchmarks.fake_osm с заданной задержкой,
+база берется из DB_* (нужны миграции alembic upgrade head). Перед
+замером в базу добавляются пользователи bench-*, их подписки и события
+на местах из записанного ответа overpass, старые данные bench-* удаляются.
+События сразу попадают в active_events, из которой читают обработчики мест.
+
+Для каждого сценария считаются p50/p95/p99, RPS и число запросов к базе
+на один запрос к API. Результат сохраняется в json и может сравниваться
+с сохраненным базовым результатом; при регрессии код выхода 1.
+Запуск из каталога backend:
+    python -m benchmarks.load --concurrency 20 --requests 500 \\
+        --osm-latency 50 --output benchmarks/results/current.json \\
+        --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+import httpx
+
+BENCH_PREFIX = 'bench-'
+USERS = 50
+SUBSCRIPTIONS_PER_USER = 10
+EVENTS_EVERY = 5
+PARTICIPANTS_PER_EVENT = 3
+REGION_NAME = 'Москва'
+COMPARED_METRICS = {
+    'p50_ms': 'lower',
+    'p95_ms': 'lower',
+    'p99_ms': 'lower',
+    'rps': 'higher',
+    'queries_per_request': 'lower',
+}
+QUERIES_TOLERANCE = 0.1
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_scenarios(elements: list[dict]) -> dict[str, Callable]:
+    """Построители запросов сценариев: (random.Random) -> (url, params)."""
+    names = sorted({
+        element['tags']['name'] for element in elements
+        if element['tags'].get('name')})
+    latitudes = [element['lat'] for element in elements]
+    longitudes = [element['lon'] for element in elements]
+
+    def telegram_id(rng: random.Random) -> str:
+        return f'{BENCH_PREFIX}{rng.randrange(USERS)}'
+
+    return {
+        'locations': lambda rng: ('/locations/', {
+            'telegram_id': telegram_id(rng),
+            'latitude': str(rng.uniform(min(latitudes), max(latitudes))),
+            'longitude': str(rng.uniform(min(longitudes), max(longitudes))),
+        }),
+        'locations_search': lambda rng: ('/locations/search/', {
+            'telegram_id': telegram_id(rng),
+            'region_name': REGION_NAME,
+            'place_name': rng.choice(names),
+        }),
+        'place_detail': lambda rng: (
+            f'/places/{rng.choice(elements)["id"]}/',
+            {'telegram_id': telegram_id(rng)}),
+        'user_places_subscription': lambda rng: (
+            f'/users/{telegram_id(rng)}/places/subscription/', {}),
+        'user': lambda rng: (f'/users/{telegram_id(rng)}/', {}),
+        'events': lambda rng: ('/events/', {'limit': 50}),
+    }
+
+
+async def seed(elements: list[dict]) -> None:
+    """Пользователи, подписки и события bench-* в базе."""
+    from sqlalchemy import delete, or_, select
+    from sqlalchemy.dialects.postgresql import insert
+
+    from active_events import refresh_active_events
+    from database import AsyncSessionLocal
+    from models import (Event, Place, User, event_participants,
+                        place_user_association, user_subscriptions)
+
+    rng = random.Random(0)
+    bench_users = User.telegram_id.startswith(BENCH_PREFIX)
+    async with AsyncSessionLocal() as db:
+        bench_events = select(Event.id).filter(
+            Event.user_id.startswith(BENCH_PREFIX))
+        await db.execute(delete(event_participants).filter(or_(
+            event_participants.c.event_id.in_(bench_events),
+            event_participants.c.user_id.startswith(BENCH_PREFIX))))
+        await db.execute(delete(Event).filter(
+            Event.user_id.startswith(BENCH_PREFIX)))
+        await db.execute(delete(place_user_association).filter(
+            place_user_association.c.user_id.startswith(BENCH_PREFIX)))
+        await db.execute(delete(user_subscriptions).filter(or_(
+            user_subscriptions.c.user_id.startswith(BENCH_PREFIX),
+            user_subscriptions.c.subscriber_id.startswith(BENCH_PREFIX))))
+        await db.execute(delete(User).filter(bench_users))
+
+        users = [f'{BENCH_PREFIX}{index}' for index in range(USERS)]
+        place_ids = [str(element['id']) for element in elements]
+        await db.execute(insert(User), [{
+            'telegram_id': user,
+            'telegram_username': user,
+            'role': 'participant',
+            'is_bot': False,
+        } for user in users])
+        await db.execute(insert(Place).on_conflict_do_nothing(
+            index_elements=[Place.place_id]), [{
+                'place_id': str(element['id']),
+                'name': element['tags'].get('name'),
+            } for element in elements])
+        await db.execute(insert(place_user_association), [
+            {'user_id': user, 'place_id': place_id}
+            for user in users
+            for place_id in rng.sample(place_ids, SUBSCRIPTIONS_PER_USER)])
+
+        now = datetime.now()
+        events = (await db.execute(insert(Event).returning(Event.id), [{
+            'name': f'Событие {index}',
+            'description': 'Встреча выпускников, приходите все',
+            'user_id': rng.choice(users),
+            'place_id': place_id,
+            'start_datetime': now + timedelta(hours=index % 24),
+            'end_datetime': now + timedelta(days=1, hours=index % 24),
+        } for index, place_id in enumerate(place_ids[::EVENTS_EVERY])]
+        )).scalars().all()
+        await db.execute(insert(event_participants), [
+            {'event_id': event_id, 'user_id': user}
+            for event_id in events
+            for user in rng.sample(users, PARTICIPANTS_PER_EVENT)])
+        await refresh_active_events(db, events)
+        await db.commit()
+
+
+async def run_scenario(
+        client: httpx.AsyncClient,
+        build_request: Callable,
+        requests: int,
+        concurrency: int,
+        rng: random.Random) -> tuple[list[float], int, float]:
+    """Задержки запросов, число ошибок и общее время сценария."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            url, params = build_request(rng)
+            started = time.perf_counter()
+            response = await client.get(url, params=params)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def get_percentile(latencies: list[float], percent: int) -> float:
+    """Перцентиль задержки в миллисекундах."""
+    if len(latencies) < 2:
+        return latencies[0] * 1000
+    return statistics.quantiles(
+        latencies, n=100, method='inclusive')[percent - 1] * 1000
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Запуск приложения с заменой OSM и замер всех сценариев.
+
+    Адреса OSM читаются config при импорте, поэтому модули приложения
+    импортируются только после того, как они заданы.
+    """
+    port = get_free_port()
+    os.environ['OVERPASS_URL'] = f'http://127.0.0.1:{port}/api/interpreter'
+    os.environ['NOMINATIM_URL'] = f'http://127.0.0.1:{port}/search'
+    os.environ['OSM_PROVIDER'] = 'overpass'
+
+    from benchmarks.fake_osm import FakeOsmServer, load_fixture
+    from main import app
+    from query_stats import count_queries
+
+    server = FakeOsmServer(port, args.osm_latency / 1000)
+    server.start()
+    elements = load_fixture('overpass.json')['elements']
+    await seed(elements)
+
+    scenarios = get_scenarios(elements)
+    if args.scenarios:
+        scenarios = {name: scenarios[name] for name in args.scenarios}
+
+    results = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                    transport=transport,
+                    base_url='http://testserver') as client:
+                for name, build_request in scenarios.items():
+                    rng = random.Random(name)
+                    await run_scenario(
+                        client, build_request, args.warmup,
+                        args.concurrency, rng)
+                    osm_requests = server.app.state.requests
+                    with count_queries() as queries:
+                        latencies, errors, elapsed = await run_scenario(
+                            client, build_request, args.requests,
+                            args.concurrency, rng)
+                    results[name] = {
+                        'requests': args.requests,
+                        'errors': errors,
+                        'rps': round(args.requests / elapsed, 1),
+                        'p50_ms': round(get_percentile(latencies, 50), 2),
+                        'p95_ms': round(get_percentile(latencies, 95), 2),
+                        'p99_ms': round(get_percentile(latencies, 99), 2),
+                        'queries_per_request': round(
+                            queries.count / args.requests, 2),
+                        'osm_requests_per_request': round(
+                            (server.app.state.requests - osm_requests)
+                            / args.requests, 3),
+                    }
+                    print_result(name, results[name])
+    finally:
+        server.stop()
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'osm_latency_ms': args.osm_latency,
+        },
+        'results': results,
+    }
+
+
+def print_result(name: str, result: dict) -> None:
+    print(f'{name:<26} '
+          f'p50 {result["p50_ms"]:>8.2f} ms  '
+          f'p95 {result["p95_ms"]:>8.2f} ms  '
+          f'p99 {result["p99_ms"]:>8.2f} ms  '
+          f'{result["rps"]:>8.1f} rps  '
+          f'{result["queries_per_request"]:>5.2f} q/req  '
+          f'ошибок {result["errors"]}')
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Сравнение с базовым результатом, возвращает список регрессий."""
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric, better in COMPARED_METRICS.items():
+            value, base_value = result[metric], base[metric]
+            change = (value - base_value) / base_value if base_value else 0
+            if metric == 'queries_per_request':
+                worse = value - base_value > QUERIES_TOLERANCE
+            elif better == 'lower':
+                worse = change > threshold
+            else:
+                worse = change < -threshold
+            mark = ' РЕГРЕССИЯ' if worse else ''
+            print(f'{name:<26} {metric:<20} {base_value:>10} -> '
+                  f'{value:<10} {change:+.0%}{mark}')
+            if worse:
+                regressions.append(f'{name}.{metric}')
+    return regressions
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный тест API с заменой OSM.')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument(
+        '--osm-latency', type=float, default=50,
+        help='Задержка ответа замены OSM, мс')
+    parser.add_argument(
+        '--scenarios', nargs='*', help='Сценарии, по умолчанию все')
+    parser.add_argument('--output', help='Файл для результата json')
+    parser.add_argument('--baseline', help='Базовый результат json')
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='Допустимое ухудшение задержки и RPS, доля')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = asyncio.run(run(args))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print(f'Регрессии: {", ".join(regressions)}')
+            raise SystemExit(1)
@@ -0,0 +1,113 @@
+"""Время кодирования ответа /locations/ из 150 мест.
+
+Сравнивается путь FastAPI по умолчанию (jsonable_encoder + JSONResponse)
+и ORJSONResponse с готовым словарем.
+Запуск из каталога backend: python -m benchmarks.serialization
+"""
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+ELEMENTS = 150
+EVENTS_EVERY = 5
+REPEAT = 200
+
+
+def build_participant(index: int) -> dict:
+    """Участник события в том виде, в каком его отдает parse_participant."""
+    return {
+        'id': index,
+        'telegram_id': str(100000000 + index),
+        'telegram_username': f'user_{index}',
+        'role': 'participant',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'language_code': 'ru',
+        'is_bot': False,
+        'created_date': datetime(2023, 10, 24, 18, 10, 32),
+        'modified_date': None,
+        'comment': '',
+    }
+
+
+def build_event(place_id: int, index: int) -> dict:
+    """Событие в том виде, в каком его отдает parse_events."""
+    start = datetime(2023, 11, 1, 19, 0) + timedelta(hours=index)
+    return {
+        'name': f'Событие {index}',
+        'description': 'Встреча выпускников, приходите все ' * 3,
+        'place_id': str(place_id),
+        'end_datetime': start + timedelta(hours=3),
+        'id': index,
+        'user_id': '123456789',
+        'start_datetime': start,
+        'comment': None,
+        'telegram_username': 'organizer',
+        'event_participants': [
+            build_participant(index * 10 + number) for number in range(3)],
+    }
+
+
+def build_payload() -> dict:
+    """Ответ /locations/ с узлами overpass-api.de и событиями."""
+    elements = []
+    for index in range(ELEMENTS):
+        place_id = 1000000000 + index
+        element = {
+            'type': 'node',
+            'id': place_id,
+            'lat': 55.75 + random.uniform(-0.002, 0.002),
+            'lon': 37.62 + random.uniform(-0.002, 0.002),
+            'tags': {
+                'amenity': random.choice(['bar', 'cafe', 'restaurant']),
+                'name': f'Заведение {index}',
+                'addr:street': 'Тверская улица',
+                'addr:housenumber': str(index),
+                'opening_hours': 'Mo-Su 10:00-23:00',
+                'cuisine': 'regional',
+                'website': f'https://example.com/{index}',
+                'wheelchair': 'limited',
+            },
+        }
+        if index % EVENTS_EVERY == 0:
+            element['events'] = [
+                build_event(place_id, index * 2 + number)
+                for number in range(2)]
+        elements.append(element)
+    return {
+        'telegram_id': '123456789',
+        'response': {
+            'version': 0.6,
+            'generator': 'Overpass API',
+            'osm3s': {'timestamp_osm_base': '2023-11-01T12:00:00Z'},
+            'elements': elements,
+        },
+    }
+
+
+def encode_default(payload: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def encode_orjson(payload: dict) -> bytes:
+    return ORJSONResponse(payload).body
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    payload = build_payload()
+    assert (json.loads(encode_default(payload))
+            == json.loads(encode_orjson(payload)))
+    size = len(encode_orjson(payload))
+    default_time = min(timeit.repeat(
+        lambda: encode_default(payload), number=REPEAT, repeat=5)) / REPEAT
+    orjson_time = min(timeit.repeat(
+        lambda: encode_orjson(payload), number=REPEAT, repeat=5)) / REPEAT
+    print(f'payload: {ELEMENTS} мест, {size / 1024:.0f} KiB')
+    print(f'jsonable_encoder + JSONResponse: {default_time * 1000:.3f} ms')
+    print(f'ORJSONResponse:                  {orjson_time * 1000:.3f} ms')
+    print(f'ускорение: {default_time / orjson_time:.0f}x')
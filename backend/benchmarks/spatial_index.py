@@ -0,0 +1,65 @@
+"""Сравнение линейного перебора и GridIndex на запросах around:200.
+
+Запуск из каталога backend: python -m benchmarks.spatial_index
+"""
+import random
+import time
+
+from geo import get_distance
+from spatial_index import GridIndex
+
+SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 20
+AROUND = 200
+CENTER = (55.75, 37.62)
+SPREAD = 0.5
+
+
+def generate_points(count: int) -> list[tuple[int, float, float]]:
+    """Случайные точки вокруг центра города."""
+    return [
+        (key,
+         CENTER[0] + random.uniform(-SPREAD, SPREAD),
+         CENTER[1] + random.uniform(-SPREAD, SPREAD))
+        for key in range(count)]
+
+
+def linear_scan(points, latitude, longitude, around):
+    """Поиск перебором всех точек."""
+    return [
+        key for key, point_latitude, point_longitude in points
+        if get_distance(
+            latitude, longitude, point_latitude, point_longitude) <= around]
+
+
+def measure(function, queries) -> float:
+    """Среднее время одного запроса в миллисекундах."""
+    started = time.perf_counter()
+    for latitude, longitude in queries:
+        function(latitude, longitude, AROUND)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    print(f'{"nodes":>10} {"build, s":>9} {"scan, ms":>10} '
+          f'{"index, ms":>10} {"speedup":>8}')
+    for size in SIZES:
+        points = generate_points(size)
+        queries = [point[1:] for point in random.sample(points, QUERIES)]
+
+        started = time.perf_counter()
+        index = GridIndex()
+        for key, latitude, longitude in points:
+            index.insert(key, latitude, longitude, key)
+        build_time = time.perf_counter() - started
+
+        for latitude, longitude in queries:
+            assert (sorted(index.radius(latitude, longitude, AROUND))
+                    == linear_scan(points, latitude, longitude, AROUND))
+
+        scan_time = measure(
+            lambda *args: linear_scan(points, *args), queries)
+        index_time = measure(index.radius, queries)
+        print(f'{size:>10} {build_time:>9.2f} {scan_time:>10.2f} '
+              f'{index_time:>10.3f} {scan_time / index_time:>8.0f}x')
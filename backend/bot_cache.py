@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import create_cache
+from config import BOT_CACHE_CHECK_INTERVAL, BOT_CACHE_TTL
+from models import CacheVersion, Command, Message
+
+logger = logging.getLogger('backend_main_logger')
+
+
+class BotResponseCache:
+    """Копия таблицы ответов бота в памяти с проверкой версии.
+
+    Версия таблицы хранится в cache_versions и увеличивается при каждой
+    записи, поэтому другие воркеры замечают изменения не позже чем через
+    BOT_CACHE_CHECK_INTERVAL секунд. Снимок таблицы каждой версии кладется
+    в общий кэш, и при изменении в базу ходит только первый воркер.
+    Если база недоступна, отдается уже загруженный снимок, а следующая
+    проверка откладывается на BOT_CACHE_CHECK_INTERVAL.
+    """
+
+    def __init__(self, model, key_field: str):
+        self.model = model
+        self.key_field = key_field
+        self.name = model.__tablename__
+        self.responses: dict[str, str] = {}
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self.check_failed = False
+        self.shared = create_cache(
+            f'bot:{self.name}', ttl=BOT_CACHE_TTL, max_entries=2)
+        self._lock = asyncio.Lock()
+
+    async def load(self, db: AsyncSession) -> None:
+        """Загрузка всей таблицы и ее версии."""
+        version = await self.get_version(db)
+        responses = await self.shared.get(str(version))
+        if responses is None:
+            key_column = getattr(self.model, self.key_field)
+            rows = (await db.execute(
+                select(key_column, self.model.response))).all()
+            responses = {key: response for key, response in rows}
+            await self.shared.set(str(version), responses)
+        self.version = version
+        self.responses = dict(responses)
+        self.checked_at = time.monotonic()
+        self.check_failed = False
+
+    async def get_version(self, db: AsyncSession) -> int:
+        """Текущая версия таблицы в базе."""
+        version = (await db.execute(
+            select(CacheVersion.version).filter_by(name=self.name)
+        )).scalar_one_or_none()
+        return version or 0
+
+    def is_fresh(self) -> bool:
+        """Рано ли снова проверять версию в базе."""
+        return ((self.version is not None or self.check_failed)
+                and time.monotonic() - self.checked_at
+                < BOT_CACHE_CHECK_INTERVAL)
+
+    async def refresh_if_stale(self, db: AsyncSession) -> None:
+        """Перезагрузка таблицы, если ее версия в базе изменилась."""
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self.is_fresh():
+                return
+            try:
+                if self.version is None:
+                    await self.load(db)
+                elif await self.get_version(db) != self.version:
+                    await self.load(db)
+                else:
+                    self.checked_at = time.monotonic()
+            except (SQLAlchemyError, OSError) as e:
+                # Соединения asyncpg падают с OSError без обертки.
+                if not self.responses:
+                    raise
+                logger.error(
+                    f'Ошибка при проверке версии {self.name}, '
+                    f'используется загруженная копия: {str(e)}')
+                self.checked_at = time.monotonic()
+                self.check_failed = True
+
+    async def get(
+            self,
+            db: AsyncSession,
+            key: str,
+            default_key: str) -> Optional[str]:
+        """Ответ по ключу или ответ по ключу по умолчанию."""
+        await self.refresh_if_stale(db)
+        response = self.responses.get(key)
+        if response is None:
+            response = self.responses.get(default_key)
+        return response
+
+    async def bump_version(self, db: AsyncSession) -> int:
+        """Увеличение версии таблицы в текущей транзакции."""
+        statement = insert(CacheVersion).values(name=self.name, version=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CacheVersion.name],
+            set_={'version': CacheVersion.version + 1},
+        ).returning(CacheVersion.version)
+        return (await db.execute(statement)).scalar_one()
+
+    async def set(
+            self,
+            key: str,
+            response: str,
+            version: int,
+            old_key: Optional[str] = None) -> None:
+        """Запись ответа в память после коммита."""
+        if old_key is not None:
+            self.responses.pop(old_key, None)
+        self.responses[key] = response
+        if self.version is not None and version == self.version + 1:
+            self.version = version
+            await self.shared.set(str(version), dict(self.responses))
+        else:
+            self.version = None
+
+
+command_cache = BotResponseCache(Command, 'command')
+message_cache = BotResponseCache(Message, 'message')
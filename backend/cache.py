@@ -0,0 +1,263 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from redis import asyncio as redis
+from redis.exceptions import RedisError
+
+from circuit_breaker import CircuitBreaker
+from config import (CACHE_BACKEND, REDIS_URL, REDIS_SOCKET_TIMEOUT,
+                    REDIS_RETRY_AFTER)
+from metrics import register_cache
+
+logger = logging.getLogger('backend_main_logger')
+redis_client: Optional[redis.Redis] = None
+# Общий для всех кэшей: после ошибки Redis не опрашивается
+# REDIS_RETRY_AFTER секунд, затем пропускается один пробный запрос.
+redis_breaker = CircuitBreaker(1, REDIS_RETRY_AFTER)
+
+
+class TTLCache:
+    """Ограниченный кэш с истечением срока и вытеснением LRU."""
+
+    def __init__(
+            self,
+            ttl: float,
+            max_entries: int,
+            max_size: Optional[int] = None,
+            sizeof: Optional[Callable[[Any], int]] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получение значения, если оно есть и не устарело."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value, size = item
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохранение значения с вытеснением самых старых записей."""
+        if key in self._data:
+            self._remove(key)
+        size = self.sizeof(value)
+        if self.max_size is not None and size > self.max_size:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value, size)
+        self.size += size
+        while (len(self._data) > self.max_entries
+               or (self.max_size is not None and self.size > self.max_size)):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Удаление значения из кэша."""
+        if key in self._data:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Очистка кэша."""
+        self._data.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов кэша."""
+        return {
+            'entries': len(self._data),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self.size -= size
+
+
+class MemoryBackend:
+    """Кэш в памяти процесса."""
+
+    def __init__(
+            self,
+            ttl: float,
+            max_entries: int,
+            max_size: Optional[int] = None,
+            sizeof: Optional[Callable[[Any], int]] = None):
+        self.cache = TTLCache(ttl, max_entries, max_size, sizeof)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Получение значения по ключу."""
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        """Сохранение значения по ключу."""
+        self.cache.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        """Удаление значения по ключу."""
+        self.cache.delete(key)
+
+    async def clear(self) -> None:
+        """Очистка кэша."""
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов кэша."""
+        return {'backend': 'memory', **self.cache.stats()}
+
+
+class RedisBackend:
+    """Общий для всех воркеров кэш в Redis.
+
+    Значения хранятся в json под ключами с префиксом namespace. Пока Redis
+    недоступен, используется локальный кэш в памяти процесса, а после
+    ошибки Redis не опрашивается REDIS_RETRY_AFTER секунд.
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            ttl: float,
+            max_entries: int,
+            max_size: Optional[int] = None,
+            sizeof: Optional[Callable[[Any], int]] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = MemoryBackend(ttl, max_entries, max_size, sizeof)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get_name(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Получение значения по ключу."""
+        if not redis_breaker.allow_request():
+            return await self.local.get(key)
+        try:
+            raw = await get_redis_client().get(self.get_name(key))
+        except RedisError as e:
+            self.on_error(e)
+            return await self.local.get(key)
+        redis_breaker.record_success()
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        """Сохранение значения по ключу."""
+        if not redis_breaker.allow_request():
+            await self.local.set(key, value)
+            return
+        try:
+            await get_redis_client().set(
+                self.get_name(key), json.dumps(value), ex=int(self.ttl))
+        except RedisError as e:
+            self.on_error(e)
+            await self.local.set(key, value)
+            return
+        redis_breaker.record_success()
+
+    async def delete(self, key: str) -> None:
+        """Удаление значения по ключу."""
+        await self.local.delete(key)
+        if not redis_breaker.allow_request():
+            return
+        try:
+            await get_redis_client().delete(self.get_name(key))
+        except RedisError as e:
+            self.on_error(e)
+            return
+        redis_breaker.record_success()
+
+    async def clear(self) -> None:
+        """Очистка всех ключей namespace."""
+        await self.local.clear()
+        if not redis_breaker.allow_request():
+            return
+        try:
+            client = get_redis_client()
+            async for name in client.scan_iter(match=self.get_name('*')):
+                await client.delete(name)
+        except RedisError as e:
+            self.on_error(e)
+            return
+        redis_breaker.record_success()
+
+    def on_error(self, error: RedisError) -> None:
+        self.errors += 1
+        redis_breaker.record_failure()
+        logger.error(f'Ошибка Redis в кэше {self.namespace}: {str(error)}')
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов кэша."""
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'local': self.local.stats(),
+        }
+
+
+def get_redis_client() -> redis.Redis:
+    """Общий клиент Redis, создается при первом обращении."""
+    global redis_client
+    if redis_client is None:
+        redis_client = redis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT)
+    return redis_client
+
+
+def set_redis_client(client: Optional[redis.Redis]) -> None:
+    """Замена клиента Redis, например на fakeredis."""
+    global redis_client
+    redis_client = client
+    redis_breaker.record_success()
+
+
+async def close_redis_client() -> None:
+    """Закрытие клиента Redis при остановке приложения."""
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+
+
+def create_cache(
+        namespace: str,
+        ttl: float,
+        max_entries: int,
+        max_size: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None):
+    """Кэш с бэкендом из настройки CACHE_BACKEND."""
+    if CACHE_BACKEND == 'redis':
+        cache = RedisBackend(namespace, ttl, max_entries, max_size, sizeof)
+    else:
+        cache = MemoryBackend(ttl, max_entries, max_size, sizeof)
+    register_cache(namespace, cache)
+    return cache
@@ -0,0 +1,78 @@
+"""Проверка Redis бэкенда кэша на локальной замене Redis.
+
+Кэш проверяется на fakeredis (pip install -r requirements-dev.txt):
+запись и чтение, удаление, очистка namespace и переход на локальный
+кэш, пока Redis недоступен. Настоящий Redis и сеть не нужны.
+Запуск из каталога backend: python check_cache.py
+"""
+import asyncio
+import sys
+
+import fakeredis
+from redis.exceptions import ConnectionError
+
+from cache import RedisBackend, redis_breaker, set_redis_client
+
+
+class BrokenRedis:
+    """Клиент Redis, у которого каждая команда падает с ошибкой."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionError('Redis недоступен')
+
+    set = delete = get
+
+
+async def check_roundtrip() -> None:
+    set_redis_client(fakeredis.FakeAsyncRedis())
+    backend = RedisBackend('check', ttl=60, max_entries=10)
+    other = RedisBackend('other', ttl=60, max_entries=10)
+    await backend.set('key', {'elements': [1, 2]})
+    await other.set('key', 'other')
+    assert await backend.get('key') == {'elements': [1, 2]}
+    assert await backend.get('missing') is None
+    await backend.delete('key')
+    assert await backend.get('key') is None
+    await backend.set('key', 1)
+    await backend.clear()
+    assert await backend.get('key') is None
+    assert await other.get('key') == 'other'
+    assert backend.stats()['errors'] == 0
+
+
+async def check_outage() -> None:
+    broken = BrokenRedis()
+    set_redis_client(broken)
+    backend = RedisBackend('check', ttl=60, max_entries=10)
+    await backend.set('key', 'local')
+    assert await backend.get('key') == 'local'
+    assert broken.calls == 1, 'после ошибки Redis не должен опрашиваться'
+    assert redis_breaker.is_open
+
+    set_redis_client(fakeredis.FakeAsyncRedis())
+    assert not redis_breaker.is_open
+    await backend.set('key', 'redis')
+    assert await backend.get('key') == 'redis'
+
+
+CHECKS = {
+    'roundtrip': check_roundtrip,
+    'outage': check_outage,
+}
+
+
+if __name__ == '__main__':
+    failed = False
+    for name, check in CHECKS.items():
+        try:
+            asyncio.run(check())
+            status = 'OK'
+        except AssertionError as e:
+            status = f'FAIL {e}'
+            failed = True
+        print(f'{name}: {status}')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,171 @@
+"""Проверка, что число запросов к базе не растет с размером ответа.
+
+Эндпоинты с риском N+1 вызываются на N и 10*N местах или пользователях,
+число запросов к базе в обоих случаях должно совпадать и не превышать
+бюджет. Ответ OSM подменяется списком мест, база берется из DB_*
+(нужны миграции alembic upgrade head). Данные budget-* создаются перед
+проверкой и удаляются после нее.
+Запуск из каталога backend: python check_query_budget.py
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+import main
+from active_events import refresh_active_events
+from database import AsyncSessionLocal
+from models import (Event, Place, User, event_participants,
+                    place_user_association)
+from query_stats import assert_max_queries
+
+PREFIX = 'budget-'
+PLACE_ID_BASE = 9_000_000_000
+SIZES = (10, 100)
+PARTICIPANTS_PER_EVENT = 3
+# Места и участники событий, затем подписки на места одним запросом.
+MAX_QUERIES = {
+    'get_location participants=count': 1,
+    'get_location participants=ids': 2,
+    'get_location participants=full': 2,
+    'get_all_places_subscription': 1,
+}
+
+
+async def clean() -> None:
+    """Удаление данных budget-*."""
+    async with AsyncSessionLocal() as db:
+        budget_events = select(Event.id).filter(
+            Event.user_id.startswith(PREFIX))
+        await db.execute(delete(event_participants).filter(or_(
+            event_participants.c.event_id.in_(budget_events),
+            event_participants.c.user_id.startswith(PREFIX))))
+        await db.execute(delete(Event).filter(
+            Event.user_id.startswith(PREFIX)))
+        await db.execute(delete(place_user_association).filter(
+            place_user_association.c.user_id.startswith(PREFIX)))
+        await db.execute(delete(User).filter(
+            User.telegram_id.startswith(PREFIX)))
+        await db.execute(delete(Place).filter(
+            Place.name.startswith(PREFIX)))
+        await db.commit()
+
+
+async def seed(size: int) -> list[dict]:
+    """size пользователей и мест с активным событием в каждом месте."""
+    await clean()
+    users = [f'{PREFIX}{index}' for index in range(size)]
+    place_ids = [str(PLACE_ID_BASE + index) for index in range(size)]
+    now = datetime.now()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [{
+            'telegram_id': user,
+            'telegram_username': user,
+            'role': 'participant',
+            'is_bot': False,
+        } for user in users])
+        await db.execute(insert(Place).on_conflict_do_nothing(
+            index_elements=[Place.place_id]), [
+                {'place_id': place_id, 'name': f'{PREFIX}{place_id}'}
+                for place_id in place_ids])
+        await db.execute(insert(place_user_association), [
+            {'user_id': user, 'place_id': place_id}
+            for user, place_id in zip(users, place_ids)])
+        event_ids = (await db.scalars(
+            insert(Event).returning(Event.id, sort_by_parameter_order=True),
+            [{
+                'name': 'Событие',
+                'user_id': user,
+                'place_id': place_id,
+                'start_datetime': now,
+                'end_datetime': now + timedelta(days=1),
+            } for user, place_id in zip(users, place_ids)])).all()
+        await db.execute(insert(event_participants), [
+            {'event_id': event_id,
+             'user_id': users[(index + shift) % size]}
+            for index, event_id in enumerate(event_ids)
+            for shift in range(1, PARTICIPANTS_PER_EVENT + 1)])
+        await refresh_active_events(db, event_ids)
+        await db.commit()
+    return [{
+        'type': 'node',
+        'id': int(place_id),
+        'lat': 55.75,
+        'lon': 37.62,
+        'tags': {'amenity': 'cafe', 'name': place_id},
+    } for place_id in place_ids]
+
+
+async def count_queries(
+        client: httpx.AsyncClient,
+        name: str,
+        url: str,
+        params: dict) -> tuple[int, object]:
+    """Число запросов к базе на один вызов эндпоинта и его ответ."""
+    with assert_max_queries(MAX_QUERIES[name]) as stats:
+        response = await client.get(url, params=params)
+    assert response.status_code == 200, (
+        f'{name}: ответ {response.status_code}')
+    return stats.count, response.json()
+
+
+async def check() -> bool:
+    elements = []
+
+    async def get_sustenance_by_position(latitude, longitude, around):
+        return {'elements': [dict(element) for element in elements]}
+
+    main.get_sustenance_by_position = get_sustenance_by_position
+    counts = {name: [] for name in MAX_QUERIES}
+    transport = httpx.ASGITransport(app=main.app)
+    failed = False
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(
+                    transport=transport,
+                    base_url='http://testserver') as client:
+                for size in SIZES:
+                    elements = await seed(size)
+                    for participants in ('count', 'ids', 'full'):
+                        name = f'get_location participants={participants}'
+                        count, body = await count_queries(
+                            client, name, '/locations/', {
+                                'telegram_id': f'{PREFIX}0',
+                                'latitude': '55.75',
+                                'longitude': '37.62',
+                                'participants': participants})
+                        places = body['response']['elements']
+                        assert len(places) == size and all(
+                            place.get('events') for place in places), (
+                            f'{name}: не у всех мест есть события')
+                        counts[name].append(count)
+                    name = 'get_all_places_subscription'
+                    count, body = await count_queries(
+                        client, name, '/users/places/subscription/',
+                        {'limit': 500})
+                    assert sum(
+                        user['telegram_id'].startswith(PREFIX)
+                        for user in body) == size, (
+                        f'{name}: в ответе не все пользователи')
+                    counts[name].append(count)
+    except AssertionError as e:
+        print(f'FAIL {e}')
+        failed = True
+    finally:
+        await clean()
+
+    for name, values in counts.items():
+        status = 'OK' if len(set(values)) == 1 else 'FAIL'
+        failed = failed or status == 'FAIL'
+        sizes = ', '.join(
+            f'{size}: {value}' for size, value in zip(SIZES, values))
+        print(f'{status:4} {name}: запросов к базе ({sizes}), '
+              f'бюджет {MAX_QUERIES[name]}')
+    return not failed
+
+
+if __name__ == '__main__':
+    sys.exit(0 if asyncio.run(check()) else 1)
@@ -0,0 +1,53 @@
+import time
+from typing import Optional
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для запросов к внешнему API.
+
+    После failure_threshold неудач подряд цепь размыкается и запросы
+    сразу отклоняются. Через reset_timeout секунд пропускается один
+    пробный запрос: при успехе цепь замыкается, при неудаче снова
+    размыкается на reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    @property
+    def is_available(self) -> bool:
+        """Будет ли запрос пропущен, без изменения состояния."""
+        return self.opened_at is None or (
+            not self.probing
+            and time.monotonic() - self.opened_at >= self.reset_timeout)
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос сейчас."""
+        if self.opened_at is None:
+            return True
+        if self.is_available:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Учет успешного запроса."""
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        """Учет неудачного запроса."""
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or (
+                self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
@@ -9,3 +9,66 @@ DB_PASS = os.environ.get('DB_PASS')
 DB_HOST = os.environ.get('DB_HOST')
 DB_PORT = os.environ.get('DB_PORT')
 DB_NAME = os.environ.get('DB_NAME')
+
+OSM_MAX_CONNECTIONS = int(os.environ.get('OSM_MAX_CONNECTIONS', 100))
+OSM_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get('OSM_MAX_KEEPALIVE_CONNECTIONS', 20))
+OSM_KEEPALIVE_EXPIRY = float(os.environ.get('OSM_KEEPALIVE_EXPIRY', 30))
+OSM_MAX_CONNECTIONS_PER_HOST = int(
+    os.environ.get('OSM_MAX_CONNECTIONS_PER_HOST', 10))
+OSM_CONNECT_TIMEOUT = float(os.environ.get('OSM_CONNECT_TIMEOUT', 5))
+OSM_READ_TIMEOUT = float(os.environ.get('OSM_READ_TIMEOUT', 25))
+
+OVERPASS_URL = os.environ.get(
+    'OVERPASS_URL', 'https://overpass-api.de/api/interpreter')
+OVERPASS_URLS = [
+    url.strip()
+    for url in os.environ.get('OVERPASS_URLS', OVERPASS_URL).split(',')
+    if url.strip()] or [OVERPASS_URL]
+OSM_MIRROR_WINDOW = int(os.environ.get('OSM_MIRROR_WINDOW', 100))
+OSM_HEDGE_REQUESTS = os.environ.get('OSM_HEDGE_REQUESTS', '0') == '1'
+OSM_HEDGE_PERCENTILE = float(os.environ.get('OSM_HEDGE_PERCENTILE', 0.9))
+OSM_HEDGE_MIN_SAMPLES = int(os.environ.get('OSM_HEDGE_MIN_SAMPLES', 20))
+OSM_HEDGE_DELAY = float(os.environ.get('OSM_HEDGE_DELAY', 1))
+NOMINATIM_URL = os.environ.get(
+    'NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+
+OSM_RETRY_ATTEMPTS = int(os.environ.get('OSM_RETRY_ATTEMPTS', 3))
+OSM_RETRY_BACKOFF = float(os.environ.get('OSM_RETRY_BACKOFF', 0.5))
+OSM_RETRY_MAX_BACKOFF = float(os.environ.get('OSM_RETRY_MAX_BACKOFF', 4))
+OSM_BREAKER_FAILURES = int(os.environ.get('OSM_BREAKER_FAILURES', 5))
+OSM_BREAKER_RESET_TIMEOUT = float(
+    os.environ.get('OSM_BREAKER_RESET_TIMEOUT', 30))
+
+OSM_CACHE_TTL = float(os.environ.get('OSM_CACHE_TTL', 6 * 60 * 60))
+OSM_STALE_TTL = float(os.environ.get('OSM_STALE_TTL', 7 * 24 * 60 * 60))
+OSM_CACHE_MAX_ENTRIES = int(os.environ.get('OSM_CACHE_MAX_ENTRIES', 10000))
+OSM_CACHE_MAX_NODES = int(os.environ.get('OSM_CACHE_MAX_NODES', 500000))
+OSM_CACHE_CELL_SIZE = float(os.environ.get('OSM_CACHE_CELL_SIZE', 0.001))
+
+OSM_PROVIDER = os.environ.get('OSM_PROVIDER', 'overpass')
+OSM_MEMORY_INDEX = os.environ.get('OSM_MEMORY_INDEX', '0') == '1'
+
+REGION_CACHE_MAX_ENTRIES = int(
+    os.environ.get('REGION_CACHE_MAX_ENTRIES', 10000))
+REGION_REFRESH_INTERVAL = float(
+    os.environ.get('REGION_REFRESH_INTERVAL', 30 * 24 * 60 * 60))
+
+BOT_CACHE_CHECK_INTERVAL = float(
+    os.environ.get('BOT_CACHE_CHECK_INTERVAL', 5))
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+EVENT_BATCH_MAX_SIZE = int(os.environ.get('EVENT_BATCH_MAX_SIZE', 500))
+SUBSCRIPTION_BATCH_MAX_SIZE = int(
+    os.environ.get('SUBSCRIPTION_BATCH_MAX_SIZE', 500))
+ACTIVE_EVENTS_SWEEP_INTERVAL = float(
+    os.environ.get('ACTIVE_EVENTS_SWEEP_INTERVAL', 60))
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 0.25))
+REDIS_RETRY_AFTER = float(os.environ.get('REDIS_RETRY_AFTER', 30))
+BOT_CACHE_TTL = float(os.environ.get('BOT_CACHE_TTL', 24 * 60 * 60))
+
+QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', 10))
@@ -1,12 +1,39 @@
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME
+from metrics import DB_POOL_CHECKOUT_WAIT
+from query_stats import install_query_listeners
 from sqlalchemy.orm import Session
 
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений с учетом времени ожидания соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
 DB_URL = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 engine = create_engine(DB_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DB_URL = (f'postgresql+asyncpg://'
+                f'{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}')
+async_engine = create_async_engine(
+    ASYNC_DB_URL, poolclass=TimedAsyncAdaptedQueuePool)
+install_query_listeners(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Session:
     """Создание соединения с postgresql."""
@@ -15,3 +42,9 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncSession:
+    """Создание асинхронного соединения с postgresql."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,103 @@
+"""Проверка планов горячих запросов через EXPLAIN.
+
+Для каждого запроса строится план с выключенным seq scan, чтобы на
+маленькой базе проверить, что нужный индекс вообще применим.
+HOT_QUERIES - запросы обработчиков main.py и active_events.py,
+REVERSE_LOOKUPS - проверка покрытия обратных поисков по внешним ключам
+(каскадное удаление, связи моделей), сами обработчики их не строят.
+Запуск из каталога backend: python explain_queries.py
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import engine
+from active_events import active_events_source, expired_events_query
+from config import DEFAULT_PAGE_SIZE
+from main import (EVENTS_PAGE_KEY, active_events_query,
+                  places_subscription_page_query,
+                  user_places_subscription_query)
+from models import Event, event_participants, user_subscriptions
+from pagination import encode_cursor, page_query
+
+HOT_QUERIES = {
+    'attach_events': (
+        active_events_query({'1', '2', '3'}),
+        'ix_active_events_place_id_end_datetime'),
+    'refresh_active_events': (
+        active_events_source([1, 2, 3]),
+        'ix_events_id'),
+    'sweep_active_events': (
+        expired_events_query(),
+        'ix_active_events_end_datetime'),
+    'get_all_events': (
+        page_query(
+            select(Event), EVENTS_PAGE_KEY, None, DEFAULT_PAGE_SIZE,
+            descending=True),
+        'ix_events_start_datetime_id'),
+    'get_all_events_after_cursor': (
+        page_query(
+            select(Event), EVENTS_PAGE_KEY,
+            encode_cursor([datetime.now(), 1]), DEFAULT_PAGE_SIZE,
+            descending=True),
+        'ix_events_start_datetime_id'),
+    'get_user_places_subscription': (
+        user_places_subscription_query('1'),
+        'ix_place_user_association_user_id'),
+    'get_all_places_subscription': (
+        places_subscription_page_query(
+            encode_cursor([1]), DEFAULT_PAGE_SIZE),
+        'ix_place_user_association_user_id'),
+}
+
+REVERSE_LOOKUPS = {
+    'events_by_organizer': (
+        select(Event).filter(Event.user_id == '1'),
+        'ix_events_user_id'),
+    'events_participated': (
+        select(event_participants.c.event_id)
+        .filter(event_participants.c.user_id == '1'),
+        'ix_event_participants_user_id'),
+    'user_subscribers': (
+        select(user_subscriptions.c.user_id)
+        .filter(user_subscriptions.c.subscriber_id == '1'),
+        'ix_user_subscriptions_subscriber_id'),
+}
+
+
+def collect_indexes(plan: dict) -> set[str]:
+    """Все индексы, используемые в узлах плана."""
+    indexes = set()
+    if 'Index Name' in plan:
+        indexes.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        indexes |= collect_indexes(child)
+    return indexes
+
+
+def explain(connection, statement) -> set[str]:
+    """Индексы из плана запроса."""
+    compiled = statement.compile(
+        dialect=engine.dialect,
+        compile_kwargs={'render_postcompile': True})
+    result = connection.exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params)
+    return collect_indexes(result.scalar()[0]['Plan'])
+
+
+if __name__ == '__main__':
+    failed = False
+    with engine.connect() as connection:
+        connection.exec_driver_sql('SET enable_seqscan = off')
+        for title, queries in (('Горячие запросы', HOT_QUERIES),
+                               ('Обратные поиски', REVERSE_LOOKUPS)):
+            print(title)
+            for name, (statement, index) in queries.items():
+                indexes = explain(connection, statement)
+                status = 'OK' if index in indexes else 'FAIL'
+                failed = failed or status == 'FAIL'
+                print(f'{status:4} {name}: {index} '
+                      f'(план: '
+                      f'{", ".join(sorted(indexes)) or "нет индексов"})')
+    sys.exit(1 if failed else 0)
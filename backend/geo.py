@@ -0,0 +1,19 @@
+import math
+
+EARTH_RADIUS = 6371008.8
+
+
+def get_distance(
+        latitude_1: float,
+        longitude_1: float,
+        latitude_2: float,
+        longitude_2: float) -> float:
+    """Расстояние между двумя точками в метрах."""
+    phi_1 = math.radians(latitude_1)
+    phi_2 = math.radians(latitude_2)
+    delta_phi = phi_2 - phi_1
+    delta_lambda = math.radians(longitude_2 - longitude_1)
+    a = (math.sin(delta_phi / 2) ** 2
+         + math.cos(phi_1) * math.cos(phi_2)
+         * math.sin(delta_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
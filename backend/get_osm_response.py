@@ -1,86 +1,495 @@
 import httpx
 import asyncio
-from typing import Union, Any
+import copy
+import logging
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Union, Any, Awaitable, Callable, Optional
 
+from config import (OSM_MAX_CONNECTIONS, OSM_MAX_KEEPALIVE_CONNECTIONS,
+                    OSM_KEEPALIVE_EXPIRY, OSM_MAX_CONNECTIONS_PER_HOST,
+                    OSM_CONNECT_TIMEOUT, OSM_READ_TIMEOUT,
+                    OVERPASS_URLS, NOMINATIM_URL, OSM_MIRROR_WINDOW,
+                    OSM_HEDGE_REQUESTS, OSM_HEDGE_PERCENTILE,
+                    OSM_HEDGE_MIN_SAMPLES, OSM_HEDGE_DELAY,
+                    OSM_RETRY_ATTEMPTS, OSM_RETRY_BACKOFF,
+                    OSM_RETRY_MAX_BACKOFF, OSM_BREAKER_FAILURES,
+                    OSM_BREAKER_RESET_TIMEOUT, OSM_STALE_TTL,
+                    OSM_CACHE_TTL, OSM_CACHE_MAX_ENTRIES,
+                    OSM_CACHE_MAX_NODES, OSM_CACHE_CELL_SIZE,
+                    REGION_CACHE_MAX_ENTRIES, REGION_REFRESH_INTERVAL)
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from cache import create_cache
+from circuit_breaker import CircuitBreaker
+from database import AsyncSessionLocal
+from geo import get_distance
+from metrics import (OSM_CIRCUIT_OPEN, OSM_COALESCED_REQUESTS,
+                     OSM_HEDGED_REQUESTS, OSM_IN_FLIGHT_REQUESTS,
+                     OSM_STALE_RESPONSES,
+                     OSM_UPSTREAM_ERRORS, OSM_UPSTREAM_LATENCY,
+                     track_osm_call)
+from mirror_pool import Mirror, MirrorPool
+from models import RegionBoundingBox
 
-async def get_response(url: str) -> Union[dict, Any]:
-    """Получение ответа от стороннего API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
+logger = logging.getLogger('backend_main_logger')
+
+http_client: Optional[httpx.AsyncClient] = None
+host_semaphores: dict[str, asyncio.Semaphore] = defaultdict(
+    lambda: asyncio.Semaphore(OSM_MAX_CONNECTIONS_PER_HOST))
+circuit_breakers: dict[str, CircuitBreaker] = defaultdict(
+    lambda: CircuitBreaker(OSM_BREAKER_FAILURES, OSM_BREAKER_RESET_TIMEOUT))
+RETRY_STATUSES = (429, 504)
+overpass_mirrors = MirrorPool(OVERPASS_URLS, OSM_MIRROR_WINDOW)
+mirror_requests: set[asyncio.Task] = set()
+
+in_flight_requests: dict[str, asyncio.Future] = {}
+OSM_IN_FLIGHT_REQUESTS.set_function(lambda: len(in_flight_requests))
+
+SEARCH_LIMIT = 10
+SUSTENANCE_AMENITIES = (
+    'bar',
+    'biergarten',
+    'cafe',
+    'fast_food',
+    'food_court',
+    'ice_cream',
+    'pub',
+    'restaurant',
+)
+sustenance_cache = create_cache(
+    'sustenance',
+    ttl=OSM_CACHE_TTL,
+    max_entries=OSM_CACHE_MAX_ENTRIES,
+    max_size=OSM_CACHE_MAX_NODES,
+    sizeof=lambda response: len(response['elements']))
+region_cache = create_cache(
+    'regions',
+    ttl=REGION_REFRESH_INTERVAL,
+    max_entries=REGION_CACHE_MAX_ENTRIES)
+stale_cache = create_cache(
+    'osm_stale',
+    ttl=OSM_STALE_TTL,
+    max_entries=OSM_CACHE_MAX_ENTRIES,
+    max_size=OSM_CACHE_MAX_NODES,
+    sizeof=lambda response: len(response['elements']))
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Создание клиента с пулом keep-alive соединений."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OSM_MAX_CONNECTIONS,
+            max_keepalive_connections=OSM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OSM_KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(
+            OSM_READ_TIMEOUT,
+            connect=OSM_CONNECT_TIMEOUT,
+            read=OSM_READ_TIMEOUT))
+
+
+async def start_http_client() -> None:
+    """Открытие общего клиента при старте приложения."""
+    global http_client
+    if http_client is None:
+        http_client = create_http_client()
+
+
+async def close_http_client() -> None:
+    """Закрытие общего клиента при остановке приложения."""
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+async def fetch(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    """Запрос с ограничением числа соединений к одному хосту."""
+    host = httpx.URL(url).host
+    async with host_semaphores[host]:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+        except httpx.HTTPError:
+            OSM_UPSTREAM_ERRORS.labels(host).inc()
+            raise
+        finally:
+            OSM_UPSTREAM_LATENCY.labels(host).observe(
+                time.perf_counter() - started)
+    if response.status_code != 200:
+        OSM_UPSTREAM_ERRORS.labels(host).inc()
+    return response
+
+
+def get_retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Пауза перед повтором: Retry-After или экспонента со случайностью."""
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return min(float(retry_after), OSM_RETRY_MAX_BACKOFF)
+    return random.uniform(
+        0, min(OSM_RETRY_BACKOFF * 2 ** attempt, OSM_RETRY_MAX_BACKOFF))
+
+
+async def fetch_with_retries(
+        client: httpx.AsyncClient,
+        url: str) -> httpx.Response:
+    """Запрос с ограниченным числом повторов при 429 и 504."""
+    for attempt in range(OSM_RETRY_ATTEMPTS - 1):
+        response = await fetch(client, url)
+        if response.status_code not in RETRY_STATUSES:
+            return response
+        await asyncio.sleep(get_retry_delay(response, attempt))
+    return await fetch(client, url)
+
+
+async def request_upstream(url: str) -> Optional[Any]:
+    """Запрос к стороннему API через размыкатель цепи хоста.
+
+    Возвращает разобранный json или None, если цепь разомкнута
+    или запрос не удался.
+    """
+    host = httpx.URL(url).host
+    breaker = circuit_breakers[host]
+    if not breaker.allow_request():
+        return None
+
+    response = None
+    try:
+        if http_client is not None:
+            response = await fetch_with_retries(http_client, url)
+        else:
+            async with create_http_client() as client:
+                response = await fetch_with_retries(client, url)
+        if response.status_code == 200:
+            return response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f'Ошибка при запросе {url}: {str(e)}')
+    finally:
+        if (response is None or response.status_code >= 500
+                or response.status_code in RETRY_STATUSES):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        OSM_CIRCUIT_OPEN.labels(host).set(breaker.is_open)
+    return None
+
+
+async def get_result_or_stale(
+        key: str,
+        source: str,
+        result: Optional[Any]) -> Union[dict, Any]:
+    """Сохранение успешного ответа или последний успешный ответ по key.
+
+    Устаревший ответ отмечается stale, если его нет - возвращается ошибка.
+    """
+    if result is not None:
+        if isinstance(result, dict):
+            await stale_cache.set(key, copy.deepcopy(result))
+        return result
+
+    response = await stale_cache.get(key)
+    if response is None:
         return {'error': 'Failed to get the response'}
+    OSM_STALE_RESPONSES.labels(source).inc()
+    return {**copy.deepcopy(response), 'stale': True}
+
+
+async def request_response(url: str) -> Union[dict, Any]:
+    """Получение ответа от стороннего API."""
+    return await get_result_or_stale(
+        url, httpx.URL(url).host, await request_upstream(url))
+
+
+async def request_mirror(mirror: Mirror, data: str) -> Optional[Any]:
+    """Запрос к зеркалу overpass с учетом его задержки и ошибок."""
+    started = time.perf_counter()
+    result = await request_upstream(f'{mirror.url}?data={data}')
+    mirror.record(time.perf_counter() - started, result is not None)
+    return result
+
+
+def start_mirror_request(mirror: Mirror, data: str) -> asyncio.Task:
+    """Запуск запроса к зеркалу, который не отменяется при хеджировании."""
+    task = asyncio.ensure_future(request_mirror(mirror, data))
+    mirror_requests.add(task)
+    task.add_done_callback(mirror_requests.discard)
+    return task
+
+
+def get_first_result(tasks: set[asyncio.Task]) -> Optional[Any]:
+    for task in tasks:
+        if task.result() is not None:
+            return task.result()
+    return None
+
+
+async def request_mirrors(data: str) -> Optional[Any]:
+    """Запрос к зеркалам overpass, начиная с самого быстрого доступного.
 
+    При ошибке запрос уходит следующему зеркалу. Если включен
+    OSM_HEDGE_REQUESTS, запрос дублируется следующему зеркалу, когда
+    текущее не ответило за OSM_HEDGE_PERCENTILE своих задержек, и берется
+    первый успешный ответ. Опоздавшие запросы не отменяются, чтобы
+    статистика медленного зеркала учитывала его реальную задержку.
+    """
+    mirrors = overpass_mirrors.get_ranked(
+        lambda mirror: circuit_breakers[mirror.host].is_available)
+    waiting: set[asyncio.Task] = set()
+    for mirror in mirrors[:-1]:
+        waiting.add(start_mirror_request(mirror, data))
+        timeout = None
+        if OSM_HEDGE_REQUESTS:
+            timeout = overpass_mirrors.get_hedge_delay(
+                mirror, OSM_HEDGE_PERCENTILE,
+                OSM_HEDGE_MIN_SAMPLES, OSM_HEDGE_DELAY)
+        done, waiting = await asyncio.wait(
+            waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        result = get_first_result(done)
+        if result is not None:
+            return result
+        if not done:
+            OSM_HEDGED_REQUESTS.inc()
 
+    waiting.add(start_mirror_request(mirrors[-1], data))
+    while waiting:
+        done, waiting = await asyncio.wait(
+            waiting, return_when=asyncio.FIRST_COMPLETED)
+        result = get_first_result(done)
+        if result is not None:
+            return result
+    return None
+
+
+async def request_overpass(data: str) -> Union[dict, Any]:
+    """Получение ответа overpass от зеркал."""
+    return await get_result_or_stale(
+        f'overpass:{data}', 'overpass', await request_mirrors(data))
+
+
+async def coalesce(
+        key: str,
+        request: Callable[[], Awaitable[Any]]) -> Union[dict, Any]:
+    """Объединение одинаковых запросов в полете.
+
+    Первый запрос по key выполняется, остальные конкурентные запросы
+    с тем же key ждут его результат и получают его копию.
+    """
+    task = in_flight_requests.get(key)
+    if task is None:
+        task = asyncio.ensure_future(request())
+        in_flight_requests[key] = task
+        task.add_done_callback(lambda _: in_flight_requests.pop(key, None))
+        return await asyncio.shield(task)
+
+    OSM_COALESCED_REQUESTS.inc()
+    return copy.deepcopy(await asyncio.shield(task))
+
+
+async def get_response(url: str) -> Union[dict, Any]:
+    """Получение ответа по url с объединением запросов в полете."""
+    return await coalesce(url, lambda: request_response(url))
+
+
+async def get_overpass_response(data: str) -> Union[dict, Any]:
+    """Получение ответа overpass с объединением запросов в полете."""
+    return await coalesce(
+        f'overpass:{data}', lambda: request_overpass(data))
+
+
+def get_grid_cell(latitude: float, longitude: float) -> tuple[int, int]:
+    """Ячейка сетки, в которую попадают координаты."""
+    return (math.floor(latitude / OSM_CACHE_CELL_SIZE),
+            math.floor(longitude / OSM_CACHE_CELL_SIZE))
+
+
+async def request_sustenance_by_position(
+        latitude: float,
+        longitude: float,
+        around: int) -> Union[dict, Any]:
+    """Запрос мест по координатом и радиусу в overpass-api.de."""
+    data = ('[out:json];'
+            '(node['
+            f'amenity~"{"|".join(SUSTENANCE_AMENITIES)}"'
+            ']'
+            f'(around:{around},{latitude},{longitude}););out;')
+
+    return await get_overpass_response(data)
+
+
+@track_osm_call
 async def get_sustenance_by_position(
         latitude: float,
         longitude: float,
         around: int) -> Union[dict, Any]:
-    """Запрос мест по координатом и радиусу."""
-    url = ('https://overpass-api.de/api/interpreter?data=[out:json];'
-           '(node['
-           'amenity~'
-           '"bar|'
-           'biergarten|'
-           'cafe|'
-           'fast_food|'
-           'food_court|'
-           'ice_cream|'
-           'pub|'
-           'restaurant"'
-           ']'
-           f'(around:{around},{latitude},{longitude}););out;')
-
-    return await get_response(url=url)
+    """Запрос мест по координатом и радиусу.
+
+    Ответ кэшируется для всей ячейки сетки: запрашивается круг
+    вокруг центра ячейки, покрывающий любую точку внутри нее,
+    а затем узлы отбираются по расстоянию до исходной точки.
+    """
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except ValueError:
+        return {'error': 'Invalid coordinates'}
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return {'error': 'Invalid coordinates'}
+    cell = get_grid_cell(latitude, longitude)
+    key = f'{cell[0]}:{cell[1]}:{around}'
+
+    response = await sustenance_cache.get(key)
+    if response is None:
+        center_latitude = round((cell[0] + 0.5) * OSM_CACHE_CELL_SIZE, 7)
+        center_longitude = round((cell[1] + 0.5) * OSM_CACHE_CELL_SIZE, 7)
+        half_diagonal = max(
+            get_distance(
+                center_latitude, center_longitude,
+                corner * OSM_CACHE_CELL_SIZE, cell[1] * OSM_CACHE_CELL_SIZE)
+            for corner in (cell[0], cell[0] + 1))
+        response = await request_sustenance_by_position(
+            center_latitude,
+            center_longitude,
+            math.ceil(around + half_diagonal))
+        if response.get('error'):
+            return response
+        if not response.get('stale'):
+            await sustenance_cache.set(key, response)
 
+    elements = [
+        dict(element) for element in response['elements']
+        if get_distance(
+            latitude, longitude,
+            element['lat'], element['lon']) <= around]
+    return {**response, 'elements': elements}
 
+
+@track_osm_call
 async def get_places_by_id(place_ids: list[str]) -> Union[dict, Any]:
     place_ids_str = ', '.join(place_ids)
     """Запрос списка мест по списку id."""
-    url = ('https://overpass-api.de/api/interpreter?data=[out:json];'
-           '(node(id:'
-           f'{place_ids_str}'
-           '););out;')
+    data = ('[out:json];'
+            '(node(id:'
+            f'{place_ids_str}'
+            '););out;')
+
+    return await get_overpass_response(data)
 
-    return await get_response(url=url)
 
+def normalize_region_name(region_name: str) -> str:
+    """Название региона без учета регистра и лишних пробелов."""
+    return ' '.join(region_name.split()).casefold()
 
-async def get_region_boundingbox(region_name: str) -> Union[dict, Any]:
-    """Запрос границ координат локации по названию."""
 
-    url = ('https://nominatim.openstreetmap.org/'
-           f'search?format=json&q={region_name}')
+async def request_region_boundingbox(
+        region_name: str) -> Optional[list[float]]:
+    """Запрос границ координат локации по названию в Nominatim."""
+    url = f'{NOMINATIM_URL}?format=json&q={region_name}'
     response = await get_response(url=url)
-    if not response:
-        return [0 for _ in range(4)]
-    return response[0]['boundingbox']
+    if not isinstance(response, list) or not response:
+        return None
+    return [float(value) for value in response[0]['boundingbox']]
+
+
+async def save_region_boundingbox(
+        region_name: str,
+        boundingbox: list[float]) -> None:
+    """Сохранение границ координат региона в базе."""
+    south, north, west, east = boundingbox
+    statement = insert(RegionBoundingBox).values(
+        region_name=region_name,
+        south=south, north=north, west=west, east=east)
+    statement = statement.on_conflict_do_update(
+        index_elements=[RegionBoundingBox.region_name],
+        set_={
+            'south': statement.excluded.south,
+            'north': statement.excluded.north,
+            'west': statement.excluded.west,
+            'east': statement.excluded.east,
+            'modified_date': datetime.now(timezone.utc),
+        })
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(statement)
+            await db.commit()
+    except (SQLAlchemyError, OSError) as e:
+        logger.error(
+            f'Ошибка при сохранении границ региона {region_name}: {str(e)}')
+
+
+@track_osm_call
+async def get_region_boundingbox(
+        region_name: str) -> Optional[list[float]]:
+    """Запрос границ координат локации по названию.
+
+    Границы берутся из памяти, затем из базы и только потом из Nominatim.
+    Устаревшая запись обновляется, а если Nominatim недоступен,
+    возвращается последнее известное значение. Ошибки базы только
+    записываются в лог, границы тогда запрашиваются у Nominatim.
+    """
+    region_name = normalize_region_name(region_name)
+    boundingbox = await region_cache.get(region_name)
+    if boundingbox is not None:
+        return boundingbox
+
+    try:
+        async with AsyncSessionLocal() as db:
+            region = (await db.execute(
+                select(RegionBoundingBox).filter_by(region_name=region_name)
+            )).scalar_one_or_none()
+    except (SQLAlchemyError, OSError) as e:
+        logger.error(
+            f'Ошибка при чтении границ региона {region_name}: {str(e)}')
+        region = None
+
+    known_boundingbox = None
+    if region is not None:
+        known_boundingbox = [
+            region.south, region.north, region.west, region.east]
+        refresh_after = region.modified_date + timedelta(
+            seconds=REGION_REFRESH_INTERVAL)
+        if refresh_after > datetime.now(timezone.utc):
+            await region_cache.set(region_name, known_boundingbox)
+            return known_boundingbox
+
+    boundingbox = await request_region_boundingbox(region_name)
+    if boundingbox is None:
+        logger.error(f'Ошибка при запросе границ региона {region_name}')
+        return known_boundingbox
+
+    await save_region_boundingbox(region_name, boundingbox)
+    await region_cache.set(region_name, boundingbox)
+    return boundingbox
 
 
+@track_osm_call
 async def get_search_by_name(
         region_name: str,
         place_name: str) -> Union[dict, Any]:
     """Запрос места по названию."""
     boundingbox = await get_region_boundingbox(region_name)
+    if boundingbox is None:
+        return {'error': 'Failed to get the region'}
     south, north, west, east = boundingbox
-    SEARCH_LIMIT = 10
-    url = ('https://overpass-api.de/api/interpreter?data=[out:json];'
-           'node[amenity~"'
-           'bar|biergarten|cafe|fast_food|food_court|ice_cream|pub|restaurant'
-           '"]'
-           f'["name"="{place_name}"]'
-           f'({south},{west},{north},{east})'
-           f';out {SEARCH_LIMIT};')
+    data = ('[out:json];'
+            f'node[amenity~"{"|".join(SUSTENANCE_AMENITIES)}"]'
+            f'["name"="{place_name}"]'
+            f'({south},{west},{north},{east})'
+            f';out {SEARCH_LIMIT};')
 
-    return await get_response(url=url)
+    return await get_overpass_response(data)
 
 
+@track_osm_call
 async def get_place_by_id(place_id: str) -> Union[dict, Any]:
     """Запрос места по id места."""
-    url = ('https://overpass-api.de/api/interpreter?data=[out:json];'
-           f'(node(id:{place_id}););out;')
+    data = ('[out:json];'
+            f'(node(id:{place_id}););out;')
 
-    return await get_response(url=url)
+    return await get_overpass_response(data)
 
 
 if __name__ == '__main__':
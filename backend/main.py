@@ -1,25 +1,81 @@
+import asyncio
 import logging
+import math
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
 from typing import Optional
 from datetime import datetime
-from typing import Union, Any
+from typing import Union, Any, AsyncIterator
 
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, Field
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, join
-from database import get_db
-from get_osm_response import (get_sustenance_by_position,
-                              get_places_by_id, get_search_by_name,
-                              get_place_by_id)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
+from sqlalchemy import delete, func, join, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from bot_cache import command_cache, message_cache
+from cache import close_redis_client
+from database import get_async_db, async_engine, AsyncSessionLocal
+from config import (OSM_PROVIDER, OSM_MEMORY_INDEX,
+                    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, EVENT_BATCH_MAX_SIZE,
+                    SUBSCRIPTION_BATCH_MAX_SIZE)
+from get_osm_response import start_http_client, close_http_client
+from metrics import MetricsMiddleware
+from active_events import (add_participants, refresh_active_events,
+                           rename_organizer, run_sweeper)
+from query_stats import QueryStatsMiddleware
+
+if OSM_PROVIDER == 'local':
+    from osm_store import (get_sustenance_by_position,
+                           get_places_by_id, get_search_by_name,
+                           get_place_by_id, load_node_index)
+else:
+    from get_osm_response import (get_sustenance_by_position,
+                                  get_places_by_id, get_search_by_name,
+                                  get_place_by_id)
+
+from models import (ActiveEvent, Command, Message, User, Event, Place,
+                    place_user_association, event_participants,
+                    user_subscriptions)
+from pagination import (NEXT_CURSOR_HEADER, fetch_page, page_query,
+                        encode_cursor, decode_cursor)
+
+logger = logging.getLogger('backend_main_logger')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Открытие и закрытие общих ресурсов приложения."""
+    await start_http_client()
+    if OSM_PROVIDER == 'local' and OSM_MEMORY_INDEX:
+        await load_node_index()
+    async with AsyncSessionLocal() as db:
+        await command_cache.load(db)
+        await message_cache.load(db)
+    sweeper = asyncio.create_task(run_sweeper())
+    yield
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
+    await close_http_client()
+    await close_redis_client()
+    await async_engine.dispose()
 
-from models import Command, Message, User, Event, Place, place_user_association
 
 app = FastAPI(
     title='Event-Explorer-Backend',
-    debug=True
+    debug=True,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 tm = datetime.now().strftime("%H:%M")
 
@@ -31,14 +87,26 @@ def read_root() -> Union[dict, Any]:
     return {'Hello': 'World'}
 
 
+@app.get('/metrics', include_in_schema=False)
+def get_metrics() -> Response:
+    """Метрики приложения в формате Prometheus."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get('/commands/', tags=['Commands'])
 async def get_all_commands(
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
-    """Функция получения всех команд."""
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция получения всех команд постранично."""
     try:
-        commands = db.query(Command).all()
+        commands, next_cursor = await fetch_page(
+            db, select(Command), [Command.id], after, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-        if not commands:
+        if not commands and after is None:
             raise HTTPException(status_code=404, detail='Нет доступных команд')
 
         commands_data = [{
@@ -57,24 +125,18 @@ async def get_all_commands(
 async def get_command(
         command: str,
         telegram_id: str = Query(...),
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция получения ответа на команду."""
     try:
-        db_command = db.query(Command).filter_by(command=command).one_or_none()
-
-        if db_command is None:
-            try:
-                db_command = db.query(Command).filter_by(
-                    command='instruction_command_1').one_or_none()
-                if db_command is None:
-                    error = 'Ошибка при запросе instruction_command_1'
-                    logger.error(error)
-                    raise HTTPException(status_code=404, detail=error)
-            except SQLAlchemyError as e:
-                logger.error(f'{error}: {str(e)}')
-                raise HTTPException(status_code=500, detail='Database error')
-
-        return {'telegram_id': telegram_id, 'response': db_command.response}
+        response = await command_cache.get(
+            db, command, 'instruction_command_1')
+
+        if response is None:
+            error = 'Ошибка при запросе instruction_command_1'
+            logger.error(error)
+            raise HTTPException(status_code=404, detail=error)
+
+        return {'telegram_id': telegram_id, 'response': response}
 
     except SQLAlchemyError as e:
         logger.error(f'Ошибка при получении команды: {str(e)}')
@@ -91,7 +153,7 @@ class CommandRequest(BaseModel):
 @app.post('/commands/', tags=['Commands'])
 async def create_command(
         request: CommandRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция создания команды."""
     telegram_id = request.telegram_id
     command = request.command
@@ -100,13 +162,15 @@ async def create_command(
     try:
         new_command = Command(command=command, response=response)
         db.add(new_command)
-        db.commit()
+        version = await command_cache.bump_version(db)
+        await db.commit()
+        await command_cache.set(command, response, version)
         logger.info(f'Команда "{command}" успешно сохранена')
         return {'telegram_id': telegram_id,
                 'response': 'Команда успешно создана'}
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при создании команды: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
@@ -115,19 +179,23 @@ async def create_command(
 async def update_command(
         command: str,
         request: CommandRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция обновления команды."""
     telegram_id = request.telegram_id
     new_command = request.command
     new_response = request.response
 
     try:
-        db_command = db.query(Command).filter_by(command=command).one_or_none()
+        db_command = (await db.execute(
+            select(Command).filter_by(command=command))).scalar_one_or_none()
 
         if db_command:
             db_command.command = new_command
             db_command.response = new_response
-            db.commit()
+            version = await command_cache.bump_version(db)
+            await db.commit()
+            await command_cache.set(
+                new_command, new_response, version, old_key=command)
             logger.info(f'Команда "{new_command}" успешно изменена')
             return {'telegram_id': telegram_id,
                     'response': 'Команда успешно обновлена'}
@@ -136,19 +204,25 @@ async def update_command(
             status_code=404, detail='Такой команды не существует')
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при изменении команды: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
 @app.get('/messages/', tags=['Messages'])
 async def get_all_messages(
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
-    """Функция получения всех сообщений."""
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция получения всех сообщений постранично."""
     try:
-        messages = db.query(Message).all()
+        messages, next_cursor = await fetch_page(
+            db, select(Message), [Message.id], after, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-        if not messages:
+        if not messages and after is None:
             raise HTTPException(
                 status_code=404,
                 detail='Нет доступных сообщений')
@@ -169,24 +243,17 @@ async def get_all_messages(
 async def get_message(
         message: str,
         telegram_id: str = Query(...),
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция получения ответа на сообщение."""
     try:
-        db_message = db.query(Message).filter_by(message=message).one_or_none()
-
-        if db_message is None:
-            try:
-                db_message = db.query(Message).filter_by(
-                    message='instruction_2').one_or_none()
-                if db_message is None:
-                    raise HTTPException(
-                        status_code=404,
-                        detail='Ошибка при запросе instruction_2')
-            except SQLAlchemyError as e:
-                logger.error(f'Database error: {str(e)}')
-                raise HTTPException(status_code=500, detail='Database error')
-
-        return {'telegram_id': telegram_id, 'response': db_message.response}
+        response = await message_cache.get(db, message, 'instruction_2')
+
+        if response is None:
+            raise HTTPException(
+                status_code=404,
+                detail='Ошибка при запросе instruction_2')
+
+        return {'telegram_id': telegram_id, 'response': response}
 
     except SQLAlchemyError as e:
         logger.error(f'Ошибка при получении сообщения: {str(e)}')
@@ -203,7 +270,7 @@ class MessageRequest(BaseModel):
 @app.post('/messages/', tags=['Messages'])
 async def create_message(
         request: MessageRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция создания сообщения."""
     telegram_id = request.telegram_id
     message = request.message
@@ -212,13 +279,15 @@ async def create_message(
     try:
         new_message = Message(message=message, response=response)
         db.add(new_message)
-        db.commit()
+        version = await message_cache.bump_version(db)
+        await db.commit()
+        await message_cache.set(message, response, version)
         logger.info(f'Сообщение "{message}" успешно создано')
         return {'telegram_id': telegram_id,
                 'response': 'Сообщение успешно создано'}
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при создании сообщения: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
@@ -227,19 +296,23 @@ async def create_message(
 async def update_message(
         message: str,
         request: MessageRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция обновления сообщения."""
     telegram_id = request.telegram_id
     new_message = request.message
     new_response = request.response
 
     try:
-        db_message = db.query(Message).filter_by(message=message).one_or_none()
+        db_message = (await db.execute(
+            select(Message).filter_by(message=message))).scalar_one_or_none()
 
         if db_message:
             db_message.message = new_message
             db_message.response = new_response
-            db.commit()
+            version = await message_cache.bump_version(db)
+            await db.commit()
+            await message_cache.set(
+                new_message, new_response, version, old_key=message)
             logger.info(f'Сообщение "{new_message}" успешно изменено')
             return {'telegram_id': telegram_id,
                     'response': 'Сообщение успешно обновлена'}
@@ -248,30 +321,109 @@ async def update_message(
             status_code=404, detail='Такого сообщения не существует')
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при изменении сообщения: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
-async def parse_events(events_in_location):
+async def parse_events(events_in_location, participants_by_event):
     events_info = []
-    for event, telegram_username in events_in_location:
+    for event in events_in_location:
         event_info = {
             'name': event.name,
             'description': event.description,
             'place_id': event.place_id,
             'end_datetime': event.end_datetime,
-            'id': event.id,
+            'id': event.event_id,
             'user_id': event.user_id,
             'start_datetime': event.start_datetime,
             'comment': event.comment,
-            'telegram_username': telegram_username,
-            'event_participants': event.participants
+            'telegram_username': event.telegram_username,
+            'event_participants': participants_by_event[event.event_id]
         }
         events_info.append(event_info)
     return events_info
 
 
+def active_events_query(place_ids: set[str]) -> Select:
+    """Запрос активных событий в местах из проекции active_events."""
+    return (
+        select(ActiveEvent)
+        .filter(
+            ActiveEvent.place_id.in_(place_ids),
+            ActiveEvent.end_datetime > datetime.now())
+    )
+
+
+async def load_participants(
+        db: AsyncSession,
+        event_ids: list[int],
+        participants: str) -> dict[int, Any]:
+    """Участники всех событий одним запросом в нужном виде.
+
+    ids - telegram_id и telegram_username, full - все поля пользователя.
+    Число участников берется из active_events без запроса.
+    """
+    participants_by_event = defaultdict(list)
+    if participants == 'full':
+        rows = await db.execute(
+            select(event_participants.c.event_id, User)
+            .join(User, User.telegram_id == event_participants.c.user_id)
+            .filter(event_participants.c.event_id.in_(event_ids)))
+        for event_id, user in rows.all():
+            participants_by_event[event_id].append(
+                await parse_participant(user))
+        return participants_by_event
+
+    rows = await db.execute(
+        select(
+            event_participants.c.event_id,
+            User.telegram_id,
+            User.telegram_username)
+        .join(User, User.telegram_id == event_participants.c.user_id)
+        .filter(event_participants.c.event_id.in_(event_ids)))
+    for event_id, telegram_id, telegram_username in rows.all():
+        participants_by_event[event_id].append({
+            'telegram_id': telegram_id,
+            'telegram_username': telegram_username})
+    return participants_by_event
+
+
+async def attach_events(
+        db: AsyncSession,
+        elements: list[dict],
+        participants: str = 'ids') -> None:
+    """Добавление активных событий к местам одним запросом."""
+    place_ids = {str(element['id']) for element in elements}
+    if not place_ids:
+        return
+
+    events_in_locations = (
+        await db.execute(active_events_query(place_ids))).scalars().all()
+    if not events_in_locations:
+        return
+
+    if participants == 'count':
+        participants_by_event = {
+            event.event_id: event.participants_count
+            for event in events_in_locations}
+    else:
+        participants_by_event = await load_participants(
+            db,
+            [event.event_id for event in events_in_locations],
+            participants)
+
+    events_by_place = defaultdict(list)
+    for event in events_in_locations:
+        events_by_place[event.place_id].append(event)
+
+    for element in elements:
+        events_in_location = events_by_place.get(str(element['id']))
+        if events_in_location:
+            element['events'] = await parse_events(
+                events_in_location, participants_by_event)
+
+
 class LocationRequest(BaseModel):
     """Влидация запроса получения мест по координатам."""
     telegram_id: str
@@ -282,35 +434,25 @@ class LocationRequest(BaseModel):
 @app.get('/locations/', tags=['Locations'])
 async def get_location(
         telegram_id: str = Query(...),
-        latitude: str = Query(...),
-        longitude: str = Query(...),
-        db: Session = Depends(get_db)):
+        latitude: float = Query(..., ge=-90, le=90, allow_inf_nan=False),
+        longitude: float = Query(
+            ..., ge=-180, le=180, allow_inf_nan=False),
+        participants: str = Query('ids', pattern='^(count|ids|full)$'),
+        db: AsyncSession = Depends(get_async_db)):
     """Функция отображения location."""
+    # FastAPI 0.104 не передает allow_inf_nan в валидацию query.
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise HTTPException(status_code=422, detail='Неверные координаты')
     around = 200
-    current_time = datetime.now()
     locations = await get_sustenance_by_position(latitude, longitude, around)
     if locations.get('error'):
         logger.error('Ошибка при запросе overpass-api.de')
         raise HTTPException(
                 status_code=404,
                 detail='Ошибка при запросе локаций')
-    for location in locations['elements']:
-        place_id = str(location['id'])
-
-        events_in_location = (
-            db.query(Event, User.telegram_username)
-            .join(User, Event.user_id == User.telegram_id)
-            .filter(
-                Event.place_id == place_id,
-                Event.end_datetime > current_time)
-            .all()
-        )
-
-        if events_in_location:
-            events_info = await parse_events(events_in_location)
-            location['events'] = events_info
+    await attach_events(db, locations['elements'], participants)
 
-    return {'telegram_id': telegram_id, 'response': locations}
+    return ORJSONResponse({'telegram_id': telegram_id, 'response': locations})
 
 
 @app.get('/locations/search/', tags=['Locations'])
@@ -318,63 +460,36 @@ async def get_location_search_by_name(
         telegram_id: str = Query(...),
         region_name: str = Query(...),
         place_name: str = Query(...),
-        db: Session = Depends(get_db)):
+        participants: str = Query('ids', pattern='^(count|ids|full)$'),
+        db: AsyncSession = Depends(get_async_db)):
     """Функция получения поиска мест по региону и названию."""
-    current_time = datetime.now()
     locations = await get_search_by_name(region_name, place_name)
     if locations.get('error'):
         logger.error('Ошибка при запросе overpass-api.de')
         raise HTTPException(
                 status_code=404,
                 detail='Ошибка при запросе локаций')
-    for location in locations['elements']:
-        place_id = str(location['id'])
-        events_in_location = (
-            db.query(Event, User.telegram_username)
-            .join(User, Event.user_id == User.telegram_id)
-            .filter(
-                Event.place_id == place_id,
-                Event.end_datetime > current_time)
-            .all()
-        )
-
-        if events_in_location:
-            events_info = await parse_events(events_in_location)
-            location['events'] = events_info
+    await attach_events(db, locations['elements'], participants)
 
-    return {'telegram_id': telegram_id, 'response': locations}
+    return ORJSONResponse({'telegram_id': telegram_id, 'response': locations})
 
 
 @app.get('/places/{place_id}/', tags=['Places'])
 async def get_place_detail(
         place_id: str,
         telegram_id: str = Query(...),
-        db: Session = Depends(get_db)):
+        participants: str = Query('ids', pattern='^(count|ids|full)$'),
+        db: AsyncSession = Depends(get_async_db)):
     """Функция получения конкретного места по place_id."""
-    current_time = datetime.now()
     locations = await get_place_by_id(place_id=place_id)
     if locations.get('error'):
         logger.error('Ошибка при запросе overpass-api.de')
         raise HTTPException(
                 status_code=404,
                 detail='Ошибка при запросе локации')
-    location = locations['elements'][0]
-    place_id = str(location['id'])
-
-    events_in_location = (
-        db.query(Event, User.telegram_username)
-        .join(User, Event.user_id == User.telegram_id)
-        .filter(
-            Event.place_id == place_id,
-            Event.end_datetime > current_time)
-        .all()
-    )
-
-    if events_in_location:
-        events_info = await parse_events(events_in_location)
-        location['events'] = events_info
+    await attach_events(db, locations['elements'][:1], participants)
 
-    return {'telegram_id': telegram_id, 'response': locations}
+    return ORJSONResponse({'telegram_id': telegram_id, 'response': locations})
 
 
 async def parse_user(db_user):
@@ -392,14 +507,24 @@ async def parse_user(db_user):
             }
 
 
+async def parse_participant(db_user):
+    return {**await parse_user(db_user), 'comment': db_user.comment}
+
+
 @app.get('/users/', tags=['Users'])
 async def get_all_users(
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
-    """Функция получения всех пользователей."""
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция получения всех пользователей постранично."""
     try:
-        users = db.query(User).all()
+        users, next_cursor = await fetch_page(
+            db, select(User), [User.id], after, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-        if not users:
+        if not users and after is None:
             raise HTTPException(
                 status_code=404,
                 detail='Нет доступных пользователей')
@@ -408,7 +533,7 @@ async def get_all_users(
 
         return users_data
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при получении списка пользователей: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
@@ -416,11 +541,12 @@ async def get_all_users(
 @app.get('/users/{telegram_id}/', tags=['Users'])
 async def get_user(
         telegram_id: str,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция получения пользователя по telegram_id."""
     try:
-        db_user = db.query(User).filter_by(
-            telegram_id=telegram_id).one_or_none()
+        db_user = (await db.execute(
+            select(User).filter_by(
+                telegram_id=telegram_id))).scalar_one_or_none()
 
         if db_user is None:
             raise HTTPException(
@@ -428,7 +554,7 @@ async def get_user(
                 detail='Ошибка при запросе user')
         return await parse_user(db_user)
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f'Ошибка при получении пользоватея {telegram_id}: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
@@ -448,47 +574,74 @@ class UserRequest(BaseModel):
 @app.post('/users/', tags=['Users'])
 async def create_user(
         request: UserRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
-    """Функция создания пользователя."""
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция создания или обновления пользователя одним запросом.
+
+    Повторный вызов с тем же telegram_id обновляет данные пользователя,
+    строка меняется только если данные отличаются.
+    """
     telegram_id = request.telegram_id
     telegram_username = request.username
     # role = request.role
-    first_name = request.first_name
-    last_name = request.last_name
-    language_code = request.language_code
-    is_bot = request.is_bot
+
+    statement = insert(User).values(
+        telegram_id=telegram_id,
+        telegram_username=telegram_username,
+        # role=role,
+        first_name=request.first_name,
+        last_name=request.last_name,
+        language_code=request.language_code,
+        is_bot=request.is_bot,
+    )
+    changed_fields = ('telegram_username', 'first_name',
+                      'last_name', 'language_code')
+    statement = statement.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={
+            **{field: statement.excluded[field] for field in changed_fields},
+            'modified_date': func.now(),
+        },
+        where=or_(*(
+            getattr(User, field).is_distinct_from(statement.excluded[field])
+            for field in changed_fields)),
+    ).returning(literal_column('xmax = 0').label('created'))
 
     try:
-        new_user = User(
-            telegram_id=telegram_id,
-            telegram_username=telegram_username,
-            # role=role,
-            first_name=first_name,
-            last_name=last_name,
-            language_code=language_code,
-            is_bot=is_bot,
-            )
-        db.add(new_user)
-        db.commit()
+        created = (await db.execute(statement)).scalar_one_or_none()
+        if created is False:
+            await rename_organizer(db, telegram_id, telegram_username)
+        await db.commit()
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(
+            f'Ошибка при создании пользователя {telegram_id}: {str(e)}')
+        raise HTTPException(status_code=500, detail='Database error')
+
+    if created:
         logger.info(
             f'Пользователь "{telegram_id}" - '
             f'"{telegram_username}" успешно создан')
         return {
             'telegram_id': telegram_id,
             'response': 'Пользователь успешно создан'}
-
-    except SQLAlchemyError as e:
-        db.rollback()
-        logger.error(
-            f'Ошибка при создании пользователя {telegram_id}: {str(e)}')
-        raise HTTPException(status_code=500, detail='Database error')
+    if created is not None:
+        logger.info(
+            f'Пользователь "{telegram_id}" - '
+            f'"{telegram_username}" изменен')
+        return {
+            'telegram_id': telegram_id,
+            'response': 'Пользователь обновлен'}
+    return {
+        'telegram_id': telegram_id,
+        'response': 'Пользователь уже существует'}
 
 
 @app.put('/users/{telegram_id}/', tags=['Users'])
 async def update_user(
         telegram_id: str,
         request: UserRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция обновления пользователя по telegram_id."""
     new_telegram_username = request.username
     new_first_name = request.first_name
@@ -496,15 +649,17 @@ async def update_user(
     new_language_code = request.language_code
 
     try:
-        db_user = db.query(User).filter_by(
-            telegram_id=telegram_id).one_or_none()
+        db_user = (await db.execute(
+            select(User).filter_by(
+                telegram_id=telegram_id))).scalar_one_or_none()
 
         if db_user:
             db_user.telegram_username = new_telegram_username
             db_user.first_name = new_first_name
             db_user.last_name = new_last_name
             db_user.language_code = new_language_code
-            db.commit()
+            await rename_organizer(db, telegram_id, new_telegram_username)
+            await db.commit()
             logger.info(
                 f'Пользователь "{telegram_id}" - '
                 f'"{new_telegram_username}" изменен')
@@ -515,67 +670,153 @@ async def update_user(
             status_code=404, detail='Такого сообщения не существует')
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f'Ошибка при изменении пользователя {telegram_id}: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+def places_subscription_query() -> Select:
+    """Запрос пользователей с избранными местами одним join."""
+    return (
+        select(
+            User.id,
+            User.telegram_id,
+            User.telegram_username,
+            User.first_name,
+            User.last_name,
+            Place.place_id,
+            Place.name)
+        .outerjoin(
+            place_user_association,
+            User.telegram_id == place_user_association.c.user_id)
+        .outerjoin(
+            Place,
+            Place.place_id == place_user_association.c.place_id)
+        .order_by(User.id, Place.place_id)
+    )
+
+
+async def group_places_subscription(
+        rows: AsyncIterator) -> AsyncIterator[tuple[int, dict]]:
+    """Группировка строк join по пользователям."""
+    user_id, user_dict = None, None
+    async for row in rows:
+        if row.id != user_id:
+            if user_dict is not None:
+                yield user_id, user_dict
+            user_id = row.id
+            user_dict = {
+                "telegram_id": row.telegram_id,
+                "telegram_username": row.telegram_username,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "favorite_places": []
+            }
+        if row.place_id is not None:
+            user_dict['favorite_places'].append({
+                'place_id': row.place_id,
+                'places_name': row.name
+            })
+    if user_dict is not None:
+        yield user_id, user_dict
+
+
+async def stream_places_subscription(
+        statement: Select) -> AsyncIterator[bytes]:
+    """Выгрузка подписок на места построчно в NDJSON.
+
+    Статус 200 уже отправлен, поэтому при ошибке базы исключение
+    пробрасывается дальше: сервер обрывает соединение без завершающего
+    чанка, и клиент видит неполную выгрузку.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            rows = await db.stream(statement)
+            async for _, user_dict in group_places_subscription(rows):
+                yield orjson.dumps(user_dict) + b'\n'
+        except SQLAlchemyError as e:
+            logger.error(
+                f'Ошибка при выгрузке подписок на места: {str(e)}')
+            raise
+
+
+def places_subscription_page_query(
+        after: Optional[str], limit: int) -> Select:
+    """Подписки на места страницы пользователей после курсора."""
+    users_page = page_query(select(User.id), [User.id], after, limit)
+    return places_subscription_query().filter(User.id.in_(users_page))
+
+
 @app.get('/users/places/subscription/', tags=['Users places subscription'])
 async def get_all_places_subscription(
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
-    """Функция получения всех подписок на все места."""
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None),
+        response_format: str = Query(
+            'json', alias='format', pattern='^(json|ndjson)$'),
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция получения всех подписок на все места.
+
+    В формате json отдается страница пользователей, в формате ndjson
+    все пользователи после курсора выгружаются потоком.
+    """
+    statement = places_subscription_query()
+    if after is not None:
+        after_id, = decode_cursor(after, [User.id])
+        statement = statement.filter(User.id > after_id)
+
+    if response_format == 'ndjson':
+        return StreamingResponse(
+            stream_places_subscription(statement),
+            media_type='application/x-ndjson')
+
     try:
-        users = db.query(User).all()
+        rows = await db.stream(places_subscription_page_query(after, limit))
+        users = [user async for user in group_places_subscription(rows)]
+
+        if len(users) > limit:
+            users = users[:limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                [users[-1][0]])
 
-        if not users:
+        if not users and after is None:
             raise HTTPException(
                 status_code=404,
                 detail='Нет доступных подписок на места')
 
-        events_data = []
-        for user in users:
-            user_dict = {
-                "telegram_id": user.telegram_id,
-                "telegram_username": user.telegram_username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "favorite_places": []
-            }
-            if user.favorite_places:
-                for place in user.favorite_places:
-                    place_dict = {
-                        'place_id': place.place_id,
-                        'places_name': place.name
-                    }
-                    user_dict['favorite_places'].append(place_dict)
-            events_data.append(user_dict)
-
-        return events_data
+        return [user_dict for _, user_dict in users]
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f'Ошибка при получении списка подписок на места: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+def user_places_subscription_query(telegram_id: str) -> Select:
+    """Запрос id мест, на которые подписан пользователь."""
+    return (
+        select(place_user_association.c.place_id)
+        .select_from(
+            join(
+                User,
+                place_user_association,
+                User.telegram_id == place_user_association.c.user_id)
+        )
+        .filter(User.telegram_id == telegram_id)
+    )
+
+
 @app.get('/users/{telegram_id}/places/subscription/',
          tags=['Users places subscription'])
 async def get_user_places_subscription(
         telegram_id: str,
-        db: Session = Depends(get_db)):
+        participants: str = Query('ids', pattern='^(count|ids|full)$'),
+        db: AsyncSession = Depends(get_async_db)):
     """Функция получения подписок пользователя на места по telegram_id."""
     try:
-        user_places_subscription = (
-            db.query(place_user_association.c.place_id)
-            .select_from(
-                join(
-                    User,
-                    place_user_association,
-                    User.telegram_id == place_user_association.c.user_id)
-            )
-            .filter(User.telegram_id == telegram_id)
-        )
+        user_places_subscription = await db.execute(
+            user_places_subscription_query(telegram_id))
 
         place_ids = [result[0] for result in user_places_subscription.all()]
 
@@ -584,36 +825,37 @@ async def get_user_places_subscription(
             logger.error(error)
             raise HTTPException(status_code=404, detail=error)
 
-        current_time = datetime.now()
         locations = await get_places_by_id(place_ids)
         if locations.get('error'):
             logger.error('Ошибка при запросе overpass-api.de')
             raise HTTPException(
                     status_code=404,
                     detail='Ошибка при запросе локаций')
-        for location in locations['elements']:
-            place_id = str(location['id'])
-
-            events_in_location = (
-                db.query(Event, User.telegram_username)
-                .join(User, Event.user_id == User.telegram_id)
-                .filter(
-                    Event.place_id == place_id,
-                    Event.end_datetime > current_time)
-                .all()
-            )
-
-            if events_in_location:
-                events_info = await parse_events(events_in_location)
-                location['events'] = events_info
+        await attach_events(db, locations['elements'], participants)
 
-        return {'telegram_id': telegram_id, 'response': locations}
+        return ORJSONResponse(
+            {'telegram_id': telegram_id, 'response': locations})
 
     except SQLAlchemyError as e:
         logger.error(f'Ошибка при получении команды: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+async def user_exists(db: AsyncSession, telegram_id: str) -> bool:
+    """Проверка существования пользователя одним запросом."""
+    return (await db.execute(
+        select(User.id).filter_by(telegram_id=telegram_id)
+    )).first() is not None
+
+
+async def count_users(db: AsyncSession, telegram_ids: set[str]) -> int:
+    """Число существующих пользователей из набора telegram_id."""
+    return (await db.execute(
+        select(func.count()).select_from(User)
+        .filter(User.telegram_id.in_(telegram_ids))
+    )).scalar_one()
+
+
 class PlaceSubscriptionRequest(BaseModel):
     """Влидация подписки пользователя на место."""
     telegram_id: str
@@ -623,38 +865,86 @@ class PlaceSubscriptionRequest(BaseModel):
 @app.post('/users/places/subscription/', tags=['Users places subscription'])
 async def create_place_subscription(
         request: PlaceSubscriptionRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция создания подписки пользователя на место."""
     telegram_id = request.telegram_id
     place_id = request.place_id
 
     try:
+        if not await user_exists(db, telegram_id):
+            error = 'Пользователь не найден'
+            logger.error(error)
+            raise HTTPException(status_code=404, detail=error)
 
-        user = db.query(User).filter_by(telegram_id=telegram_id).first()
-        place = db.query(Place).filter_by(place_id=place_id).first()
-        if not place:
-            place = Place(place_id=place_id)
-            db.add(place)
-            db.commit()
+        await db.execute(
+            insert(Place).values(place_id=place_id)
+            .on_conflict_do_nothing(index_elements=[Place.place_id]))
+        await db.execute(
+            insert(place_user_association)
+            .values(user_id=telegram_id, place_id=place_id)
+            .on_conflict_do_nothing())
+        await db.commit()
+        logger.info(
+            f'Пользователь:"{telegram_id}" '
+            f'Добавил место id:"{place_id}" в избранное')
+        return {
+            'user_id': telegram_id,
+            'place_id': place_id,
+            'response': 'Добавлено в избранное'}
 
-        if user is not None:
-            user.favorite_places.append(place)
-            db.commit()
-            logger.info(
-                f'Пользователь:"{telegram_id}" '
-                f'Добавил место id:"{place_id}" в избранное')
-            return {
-                'user_id': telegram_id,
-                'place_id': place_id,
-                'response': 'Добавлено в избранное'}
-        else:
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f'Ошибка при добавление места в избранное: {str(e)}')
+        raise HTTPException(status_code=500, detail='Database error')
+
+
+class PlaceSubscriptionBatchRequest(BaseModel):
+    """Влидация подписки пользователя на несколько мест."""
+    telegram_id: str
+    place_ids: list[str] = Field(
+        min_length=1, max_length=SUBSCRIPTION_BATCH_MAX_SIZE)
+
+
+@app.post('/users/places/subscription/batch/',
+          tags=['Users places subscription'])
+async def create_place_subscriptions_batch(
+        request: PlaceSubscriptionBatchRequest,
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция подписки пользователя на несколько мест одним запросом."""
+    telegram_id = request.telegram_id
+    place_ids = sorted(set(request.place_ids))
+
+    try:
+        if not await user_exists(db, telegram_id):
             error = 'Пользователь не найден'
             logger.error(error)
             raise HTTPException(status_code=404, detail=error)
 
+        await db.execute(
+            insert(Place)
+            .values([{'place_id': place_id} for place_id in place_ids])
+            .on_conflict_do_nothing(index_elements=[Place.place_id]))
+        created = (await db.execute(
+            insert(place_user_association)
+            .values([{'user_id': telegram_id, 'place_id': place_id}
+                     for place_id in place_ids])
+            .on_conflict_do_nothing()
+            .returning(place_user_association.c.place_id)
+        )).scalars().all()
+        await db.commit()
+
+        logger.info(
+            f'Пользователь:"{telegram_id}" '
+            f'Добавил в избранное мест: {len(created)}')
+        return {
+            'user_id': telegram_id,
+            'created': created,
+            'existing': sorted(set(place_ids) - set(created)),
+            'response': 'Добавлено в избранное'}
+
     except SQLAlchemyError as e:
-        db.rollback()
-        logger.error(f'Ошибка при добавление места в избранное: {str(e)}')
+        await db.rollback()
+        logger.error(f'Ошибка при добавление мест в избранное: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
@@ -663,34 +953,30 @@ async def create_place_subscription(
 async def delete_user_place_subscription(
         telegram_id: str,
         place_id: str = Query(...),
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция удаления подписки пользоваетеля на место."""
 
     try:
-        user = db.query(User).filter(
-            User.telegram_id == telegram_id,
-            User.favorite_places.any(Place.place_id == place_id)
-        ).one_or_none()
-
-        if user:
-            place = db.query(Place).filter(Place.place_id == place_id).first()
-            if place:
-                user.favorite_places.remove(place)
-                db.commit()
-                logger.info(
-                    f'Пользователь:"{telegram_id}" '
-                    f'Удалил место id:"{place_id}" из избранного')
-                return {
-                    'user_id': telegram_id,
-                    'place_id': place_id,
-                    'response': 'Удалено избранное'}
-        else:
+        result = await db.execute(
+            delete(place_user_association).filter(
+                place_user_association.c.user_id == telegram_id,
+                place_user_association.c.place_id == place_id))
+        if not result.rowcount:
             error = 'Подписка не найдена'
             logger.error(error)
             raise HTTPException(status_code=404, detail=error)
 
+        await db.commit()
+        logger.info(
+            f'Пользователь:"{telegram_id}" '
+            f'Удалил место id:"{place_id}" из избранного')
+        return {
+            'user_id': telegram_id,
+            'place_id': place_id,
+            'response': 'Удалено избранное'}
+
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при удалении места из избранного: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
@@ -698,10 +984,13 @@ async def delete_user_place_subscription(
 @app.get('/users/{telegram_id}/subscription/', tags=['Users subscription'])
 async def get_user_subscription(
         telegram_id: str,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция получения подписок пользователя на других пользователей."""
     try:
-        user = db.query(User).filter_by(telegram_id=telegram_id).one_or_none()
+        user = (await db.execute(
+            select(User).filter_by(telegram_id=telegram_id)
+            .options(selectinload(User.subscriptions))
+        )).scalar_one_or_none()
         subscriptions = [{
             'telegram_id': user.telegram_id,
             'telegram_username': user.telegram_username
@@ -723,67 +1012,128 @@ class UserSubscriptionRequest(BaseModel):
 @app.post('/users/subscription/', tags=['Users subscription'])
 async def create_user_subscription(
         request: UserSubscriptionRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция создания подписки пользователя на пользователя."""
     telegram_id = request.telegram_id
     subscription_id = request.subscription_id
 
     try:
-        telegram_user = db.query(User).filter_by(
-            telegram_id=telegram_id).one_or_none()
-        subscription_user = db.query(User).filter_by(
-            telegram_id=subscription_id).one_or_none()
-
-        if telegram_user and subscription_user:
-            if telegram_user == subscription_user:
-                return {'error': 'Нельзя подписываться на самого себя!'}
-            telegram_user.subscriptions.append(subscription_user)
-            db.commit()
-            logger.info(
-                f'Пользователь:"{telegram_id}" '
-                f'Подписался на:"{subscription_id}"')
-            return {
-                'telegram_id': telegram_id,
-                'subscription_id': subscription_id,
-                'response': 'Подписка прошла удачно'}
-        else:
+        found = await count_users(db, {telegram_id, subscription_id})
+        if found != len({telegram_id, subscription_id}):
             error = 'Пользователь не найден'
             logger.error(error)
             raise HTTPException(status_code=404, detail=error)
+        if telegram_id == subscription_id:
+            return {'error': 'Нельзя подписываться на самого себя!'}
+
+        await db.execute(
+            insert(user_subscriptions)
+            .values(user_id=telegram_id, subscriber_id=subscription_id)
+            .on_conflict_do_nothing())
+        await db.commit()
+        logger.info(
+            f'Пользователь:"{telegram_id}" '
+            f'Подписался на:"{subscription_id}"')
+        return {
+            'telegram_id': telegram_id,
+            'subscription_id': subscription_id,
+            'response': 'Подписка прошла удачно'}
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f'Ошибка при добавление пользователя в избранное: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+class UserSubscriptionBatchRequest(BaseModel):
+    """Влидация подписки пользователя на несколько пользователей."""
+    telegram_id: str
+    subscription_ids: list[str] = Field(
+        min_length=1, max_length=SUBSCRIPTION_BATCH_MAX_SIZE)
+
+
+@app.post('/users/subscription/batch/', tags=['Users subscription'])
+async def create_user_subscriptions_batch(
+        request: UserSubscriptionBatchRequest,
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция подписки пользователя на несколько пользователей.
+
+    Подписка на самого себя не создается, такой id возвращается
+    в rejected.
+    """
+    telegram_id = request.telegram_id
+    subscription_ids = set(request.subscription_ids) - {telegram_id}
+
+    try:
+        found = set((await db.execute(
+            select(User.telegram_id).filter(
+                User.telegram_id.in_(subscription_ids | {telegram_id})))
+        ).scalars())
+        if telegram_id not in found:
+            error = 'Пользователь не найден'
+            logger.error(error)
+            raise HTTPException(status_code=404, detail=error)
+
+        subscription_ids = sorted(subscription_ids & found)
+        created = []
+        if subscription_ids:
+            created = (await db.execute(
+                insert(user_subscriptions)
+                .values([{'user_id': telegram_id,
+                          'subscriber_id': subscription_id}
+                         for subscription_id in subscription_ids])
+                .on_conflict_do_nothing()
+                .returning(user_subscriptions.c.subscriber_id)
+            )).scalars().all()
+            await db.commit()
+
+        logger.info(
+            f'Пользователь:"{telegram_id}" '
+            f'Подписался на пользователей: {len(created)}')
+        return {
+            'telegram_id': telegram_id,
+            'created': created,
+            'existing': sorted(set(subscription_ids) - set(created)),
+            'not_found': sorted(
+                set(request.subscription_ids) - found - {telegram_id}),
+            'rejected': [telegram_id]
+            if telegram_id in request.subscription_ids else [],
+            'response': 'Подписка прошла удачно'}
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(
+            f'Ошибка при добавление пользователей в избранное: {str(e)}')
+        raise HTTPException(status_code=500, detail='Database error')
+
+
 @app.delete('/users/{telegram_id}/subscription/', tags=['Users subscription'])
 async def delete_user_subscription(
         telegram_id: str,
         subscription_id: str = Query(...),
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция удаления подписки пользователя на пользователя."""
     try:
-        user = db.query(User).filter_by(telegram_id=telegram_id).one_or_none()
-        subscription = db.query(User).filter_by(
-            telegram_id=subscription_id).one_or_none()
-        if user and subscription:
-            if subscription in user.subscriptions:
-                user.subscriptions.remove(subscription)
-                db.commit()
-                return {'telegram_id': telegram_id,
-                        'response': f'Подписка на {subscription_id} удалена'}
-            else:
-                error = 'Подписка не найдена'
-                logger.error(error)
-                raise HTTPException(status_code=404, detail=error)
+        result = await db.execute(
+            delete(user_subscriptions).filter(
+                user_subscriptions.c.user_id == telegram_id,
+                user_subscriptions.c.subscriber_id == subscription_id))
+        if result.rowcount:
+            await db.commit()
+            return {'telegram_id': telegram_id,
+                    'response': f'Подписка на {subscription_id} удалена'}
+
+        if await count_users(db, {telegram_id, subscription_id}) == len(
+                {telegram_id, subscription_id}):
+            error = 'Подписка не найдена'
         else:
             error = 'Пользователь не найден'
-            logger.error(error)
-            raise HTTPException(status_code=404, detail=error)
+        logger.error(error)
+        raise HTTPException(status_code=404, detail=error)
 
     except SQLAlchemyError as e:
+        await db.rollback()
         logger.error(
             f'Ошибка при получении списка подписок пользователя: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
@@ -798,50 +1148,116 @@ class EventSubscriptionRequest(BaseModel):
 @app.post('/users/events/subscription/', tags=['Users events subscription'])
 async def create_event_subscription(
         request: EventSubscriptionRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция создания подписки на событие."""
     telegram_id = request.telegram_id
     event_id = request.event_id
 
     try:
-
-        user = db.query(User).filter_by(telegram_id=telegram_id).first()
-        event = db.query(Event).filter_by(id=event_id).first()
-
-        if user is not None and event is not None:
-            user.events_participated.append(event)
-            db.commit()
-            logger.info(
-                f'Участие пользователя:"{telegram_id}" '
-                f'в событии id:"{event_id}" успешно создано')
-            return {
-                'user_id': telegram_id,
-                'event_id': event_id,
-                'response': 'Участие подтверждено'}
-        else:
+        event_found = (await db.execute(
+            select(Event.id).filter_by(id=event_id))).first() is not None
+        if not event_found or not await user_exists(db, telegram_id):
             error = 'Пользователь или событие не найдены'
             logger.error(error)
             raise HTTPException(status_code=404, detail=error)
 
+        created = (await db.execute(
+            insert(event_participants)
+            .values(event_id=event_id, user_id=telegram_id)
+            .on_conflict_do_nothing()
+            .returning(event_participants.c.event_id)
+        )).scalars().all()
+        await add_participants(db, created)
+        await db.commit()
+        logger.info(
+            f'Участие пользователя:"{telegram_id}" '
+            f'в событии id:"{event_id}" успешно создано')
+        return {
+            'user_id': telegram_id,
+            'event_id': event_id,
+            'response': 'Участие подтверждено'}
+
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при создании подписки на событие: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+class EventSubscriptionBatchRequest(BaseModel):
+    """Влидация подписки на несколько событий."""
+    telegram_id: str
+    event_ids: list[int] = Field(
+        min_length=1, max_length=SUBSCRIPTION_BATCH_MAX_SIZE)
+
+
+@app.post('/users/events/subscription/batch/',
+          tags=['Users events subscription'])
+async def create_event_subscriptions_batch(
+        request: EventSubscriptionBatchRequest,
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция подписки пользователя на несколько событий."""
+    telegram_id = request.telegram_id
+
+    try:
+        if not await user_exists(db, telegram_id):
+            error = 'Пользователь не найден'
+            logger.error(error)
+            raise HTTPException(status_code=404, detail=error)
+
+        event_ids = sorted((await db.execute(
+            select(Event.id).filter(Event.id.in_(set(request.event_ids))))
+        ).scalars())
+        created = []
+        if event_ids:
+            created = (await db.execute(
+                insert(event_participants)
+                .values([{'event_id': event_id, 'user_id': telegram_id}
+                         for event_id in event_ids])
+                .on_conflict_do_nothing()
+                .returning(event_participants.c.event_id)
+            )).scalars().all()
+            await add_participants(db, created)
+            await db.commit()
+
+        logger.info(
+            f'Участие пользователя:"{telegram_id}" '
+            f'в событиях: {len(created)}')
+        return {
+            'user_id': telegram_id,
+            'created': created,
+            'existing': sorted(set(event_ids) - set(created)),
+            'not_found': sorted(set(request.event_ids) - set(event_ids)),
+            'response': 'Участие подтверждено'}
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f'Ошибка при создании подписок на события: {str(e)}')
+        raise HTTPException(status_code=500, detail='Database error')
+
+
 async def is_event_finished(event: datetime) -> bool:
     current_time = datetime.now()
     return event < current_time
 
 
+EVENTS_PAGE_KEY = [Event.start_datetime, Event.id]
+
+
 @app.get('/events/', tags=['Events'])
 async def get_all_events(
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
-    """Функция получения всех подписок всех пользователей."""
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция получения всех событий постранично, новые первыми."""
     try:
-        events = db.query(Event).order_by(desc(Event.start_datetime)).all()
+        events, next_cursor = await fetch_page(
+            db, select(Event), EVENTS_PAGE_KEY,
+            after, limit, descending=True)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-        if not events:
+        if not events and after is None:
             raise HTTPException(
                 status_code=404,
                 detail='Нет доступных событий')
@@ -860,11 +1276,14 @@ async def get_all_events(
 
         return events_data
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при получении списка событий: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
 class EventRequest(BaseModel):
     """Влидация создания события."""
     name: str = Field(max_length=50)
@@ -878,7 +1297,7 @@ class EventRequest(BaseModel):
 @app.post('/events/', tags=['Events'])
 async def create_event(
         request: EventRequest,
-        db: Session = Depends(get_db)) -> Union[dict, Any]:
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
     """Функция создания события."""
     name = request.name
     description = request.description
@@ -886,28 +1305,21 @@ async def create_event(
     place_id = request.place_id
     start_datetime = request.start_datetime
     end_datetime = request.end_datetime
-    date_format = "%Y-%m-%dT%H:%M:%S.%f"
 
     try:
-        existing_place = db.query(Place).filter(
-            Place.place_id == place_id).one_or_none()
-
-        if existing_place:
-            place = existing_place
-        else:
-            place = Place(place_id=place_id)
-
-        new_event = Event(
+        await db.execute(
+            insert(Place).values(place_id=place_id)
+            .on_conflict_do_nothing(index_elements=[Place.place_id]))
+        event_id = (await db.execute(insert(Event).values(
             name=name,
             description=description,
             user_id=telegram_id,
-            place=place,
-            start_datetime=datetime.strptime(start_datetime, date_format),
-            end_datetime=datetime.strptime(end_datetime, date_format)
-        )
-
-        db.add(new_event)
-        db.commit()
+            place_id=place_id,
+            start_datetime=datetime.strptime(start_datetime, DATE_FORMAT),
+            end_datetime=datetime.strptime(end_datetime, DATE_FORMAT)
+        ).returning(Event.id))).scalar_one()
+        await refresh_active_events(db, [event_id])
+        await db.commit()
 
         logger.info(f'Событие "{name}" в "{place_id}" успешно создано')
 
@@ -915,11 +1327,95 @@ async def create_event(
                 'response': 'Событие успешно создано'}
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f'Ошибка при создании события: {str(e)}')
         raise HTTPException(status_code=500, detail='Database error')
 
 
+class EventBatchRequest(BaseModel):
+    """Влидация пакетного создания событий."""
+    events: list[EventRequest] = Field(
+        min_length=1, max_length=EVENT_BATCH_MAX_SIZE)
+
+
+@app.post('/events/batch/', tags=['Events'])
+async def create_events_batch(
+        request: EventBatchRequest,
+        db: AsyncSession = Depends(get_async_db)) -> Union[dict, Any]:
+    """Функция создания пакета событий в одной транзакции.
+
+    События с неверной датой или несуществующим пользователем
+    пропускаются, остальные создаются, недостающие места добавляются.
+    """
+    results = [None] * len(request.events)
+    rows = []
+    for index, event in enumerate(request.events):
+        try:
+            start_datetime = datetime.strptime(
+                event.start_datetime, DATE_FORMAT)
+            end_datetime = datetime.strptime(event.end_datetime, DATE_FORMAT)
+        except ValueError:
+            results[index] = {
+                'index': index,
+                'status': 'error',
+                'detail': 'Неверный формат даты'}
+            continue
+        rows.append((index, {
+            'name': event.name,
+            'description': event.description,
+            'user_id': event.telegram_id,
+            'place_id': event.place_id,
+            'start_datetime': start_datetime,
+            'end_datetime': end_datetime,
+        }))
+
+    try:
+        existing_users = set((await db.execute(
+            select(User.telegram_id).filter(
+                User.telegram_id.in_({row['user_id'] for _, row in rows})))
+        ).scalars())
+        for index, row in rows:
+            if row['user_id'] not in existing_users:
+                results[index] = {
+                    'index': index,
+                    'status': 'error',
+                    'detail': 'Пользователь не найден'}
+        rows = [(index, row) for index, row in rows
+                if row['user_id'] in existing_users]
+
+        created_places = []
+        event_ids = []
+        if rows:
+            created_places = (await db.execute(
+                insert(Place)
+                .values([{'place_id': place_id} for place_id in sorted(
+                    {row['place_id'] for _, row in rows})])
+                .on_conflict_do_nothing(index_elements=[Place.place_id])
+                .returning(Place.place_id)
+            )).scalars().all()
+            event_ids = (await db.scalars(
+                insert(Event).returning(
+                    Event.id, sort_by_parameter_order=True),
+                [row for _, row in rows])).all()
+            await refresh_active_events(db, event_ids)
+        await db.commit()
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f'Ошибка при пакетном создании событий: {str(e)}')
+        raise HTTPException(status_code=500, detail='Database error')
+
+    for (index, _), event_id in zip(rows, event_ids):
+        results[index] = {'index': index, 'status': 'created', 'id': event_id}
+
+    logger.info(f'Пакетно создано событий: {len(event_ids)}, '
+                f'мест: {len(created_places)}')
+
+    return {'response': f'Создано событий: {len(event_ids)}',
+            'created_places': created_places,
+            'results': results}
+
+
 if __name__ == '__main__':
 
     logger = logging.getLogger('backend_main_logger')
@@ -0,0 +1,154 @@
+import time
+from functools import wraps
+from typing import Any, Callable
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса к API',
+    ['method', 'route'])
+REQUEST_COUNT = Counter(
+    'http_requests',
+    'Число запросов к API по статусам ответа',
+    ['method', 'route', 'status'])
+OSM_CALL_LATENCY = Histogram(
+    'osm_call_duration_seconds',
+    'Время получения данных OSM с учетом кэша',
+    ['function'])
+OSM_CALL_ERRORS = Counter(
+    'osm_call_errors',
+    'Число ошибок получения данных OSM',
+    ['function'])
+OSM_UPSTREAM_LATENCY = Histogram(
+    'osm_upstream_request_duration_seconds',
+    'Время http запроса к overpass-api.de и Nominatim',
+    ['host'])
+OSM_UPSTREAM_ERRORS = Counter(
+    'osm_upstream_request_errors',
+    'Число неудачных http запросов к overpass-api.de и Nominatim',
+    ['host'])
+OSM_HEDGED_REQUESTS = Counter(
+    'osm_hedged_requests',
+    'Число запросов overpass, продублированных другому зеркалу')
+OSM_COALESCED_REQUESTS = Counter(
+    'osm_coalesced_requests',
+    'Число запросов OSM, дождавшихся такого же запроса в полете')
+OSM_IN_FLIGHT_REQUESTS = Gauge(
+    'osm_in_flight_requests',
+    'Число уникальных запросов OSM в полете')
+OSM_CIRCUIT_OPEN = Gauge(
+    'osm_circuit_breaker_open',
+    'Разомкнута ли цепь запросов к хосту OSM',
+    ['host'])
+OSM_STALE_RESPONSES = Counter(
+    'osm_stale_responses',
+    'Число устаревших ответов OSM, отданных вместо ошибки',
+    ['source'])
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Время ожидания соединения из пула базы',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1,
+             2.5, 5, 10))
+
+caches: dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Добавление кэша со счетчиками stats() в метрики."""
+    caches[name] = cache
+
+
+class CacheCollector:
+    """Счетчики попаданий в кэши, собираются при запросе /metrics."""
+
+    def collect(self):
+        hits = CounterMetricFamily(
+            'cache_hits', 'Число попаданий в кэш', labels=['cache'])
+        misses = CounterMetricFamily(
+            'cache_misses', 'Число промахов кэша', labels=['cache'])
+        ratio = GaugeMetricFamily(
+            'cache_hit_ratio', 'Доля попаданий в кэш', labels=['cache'])
+        errors = CounterMetricFamily(
+            'cache_errors', 'Число ошибок общего кэша', labels=['cache'])
+        fallback_hits = CounterMetricFamily(
+            'cache_fallback_hits',
+            'Число попаданий в локальный кэш, пока общий недоступен',
+            labels=['cache'])
+        fallback_misses = CounterMetricFamily(
+            'cache_fallback_misses',
+            'Число промахов локального кэша, пока общий недоступен',
+            labels=['cache'])
+        for name, cache in caches.items():
+            stats = cache.stats()
+            total = stats['hits'] + stats['misses']
+            hits.add_metric([name], stats['hits'])
+            misses.add_metric([name], stats['misses'])
+            ratio.add_metric([name], stats['hits'] / total if total else 0)
+            if 'errors' in stats:
+                errors.add_metric([name], stats['errors'])
+            if 'local' in stats:
+                fallback_hits.add_metric([name], stats['local']['hits'])
+                fallback_misses.add_metric([name], stats['local']['misses'])
+        yield hits
+        yield misses
+        yield ratio
+        yield errors
+        yield fallback_hits
+        yield fallback_misses
+
+
+REGISTRY.register(CacheCollector())
+
+
+class MetricsMiddleware:
+    """ASGI middleware с задержкой и статусом ответа по шаблону пути."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            path = route.path if route is not None else 'unmatched'
+            REQUEST_LATENCY.labels(scope['method'], path).observe(
+                time.perf_counter() - started)
+            REQUEST_COUNT.labels(scope['method'], path, status).inc()
+
+
+def track_osm_call(function: Callable) -> Callable:
+    """Учет времени и ошибок функции получения данных OSM."""
+    latency = OSM_CALL_LATENCY.labels(function.__name__)
+    errors = OSM_CALL_ERRORS.labels(function.__name__)
+
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await function(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+        if result is None or (isinstance(result, dict) and 'error' in result):
+            errors.inc()
+        return result
+
+    return wrapper
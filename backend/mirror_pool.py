@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Callable, Optional
+
+import httpx
+
+
+class Mirror:
+    """Зеркало API со статистикой последних запросов."""
+
+    def __init__(self, url: str, window: int):
+        self.url = url
+        self.host = httpx.URL(url).host
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Учет завершенного запроса к зеркалу."""
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+
+    def get_score(self) -> float:
+        """Ожидаемое время до успешного ответа, меньше - лучше.
+
+        Зеркало без статистики получает 0, чтобы его тоже попробовали.
+        """
+        if not self.outcomes:
+            return 0.0
+        success_rate = sum(self.outcomes) / len(self.outcomes)
+        if not self.latencies:
+            return float('inf')
+        latency = sum(self.latencies) / len(self.latencies)
+        return latency / max(success_rate, 0.01)
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        """Перцентиль задержки успешных запросов или None."""
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(
+            int(len(latencies) * percentile), len(latencies) - 1)]
+
+
+class MirrorPool:
+    """Набор зеркал, упорядоченных от самого быстрого доступного."""
+
+    def __init__(self, urls: list[str], window: int = 100):
+        self.mirrors = [Mirror(url, window) for url in urls]
+
+    def get_ranked(
+            self,
+            is_available: Callable[[Mirror], bool]) -> list[Mirror]:
+        """Доступные зеркала по возрастанию оценки, затем недоступные."""
+        return sorted(
+            self.mirrors,
+            key=lambda mirror: (not is_available(mirror), mirror.get_score()))
+
+    def get_hedge_delay(
+            self,
+            mirror: Mirror,
+            percentile: float,
+            min_samples: int,
+            default: float) -> float:
+        """Через сколько секунд дублировать запрос к следующему зеркалу."""
+        if len(mirror.latencies) < min_samples:
+            return default
+        return mirror.get_percentile(percentile)
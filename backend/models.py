@@ -1,7 +1,8 @@
 from sqlalchemy import (Column, Integer, String,
                         MetaData, DateTime, Boolean,
                         Enum, Text, ForeignKey, Table,
-                        CheckConstraint)
+                        CheckConstraint, BigInteger, Float,
+                        JSON, Index)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -53,7 +54,8 @@ user_subscriptions = Table(
     CheckConstraint(
         ' user_id' != 'subscriber_id',
         name='check_unique_constraint'
-    )
+    ),
+    Index('ix_user_subscriptions_subscriber_id', 'subscriber_id'),
 )
 
 place_user_association = Table(
@@ -69,6 +71,7 @@ place_user_association = Table(
         String,
         ForeignKey('users.telegram_id'),
         primary_key=True),
+    Index('ix_place_user_association_user_id', 'user_id'),
 )
 
 event_participants = Table(
@@ -84,6 +87,7 @@ event_participants = Table(
         String,
         ForeignKey('users.telegram_id'),
         primary_key=True),
+    Index('ix_event_participants_user_id', 'user_id'),
 )
 
 
@@ -150,12 +154,19 @@ class Event(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, default='Событие')
     description = Column(Text, nullable=True)
-    user_id = Column(String, ForeignKey('users.telegram_id'), nullable=False)
+    user_id = Column(
+        String, ForeignKey('users.telegram_id'), index=True, nullable=False)
     place_id = Column(String, ForeignKey('places.place_id'), nullable=False)
     start_datetime = Column(DateTime, nullable=False)
     end_datetime = Column(DateTime, nullable=False)
     comment = Column(String, nullable=True)
 
+    __table_args__ = (
+        Index(
+            'ix_events_place_id_end_datetime', 'place_id', 'end_datetime'),
+        Index('ix_events_start_datetime_id', 'start_datetime', 'id'),
+    )
+
     place = relationship('Place', back_populates='events')
 
     participants = relationship(
@@ -167,6 +178,33 @@ class Event(Base):
     )
 
 
+class ActiveEvent(Base):
+    """Модель проекции активного события для выдачи по местам."""
+    __tablename__ = 'active_events'
+
+    event_id = Column(
+        Integer,
+        ForeignKey('events.id', ondelete='CASCADE'),
+        primary_key=True,
+        autoincrement=False)
+    place_id = Column(String, nullable=False)
+    user_id = Column(String, index=True, nullable=False)
+    telegram_username = Column(String, nullable=True)
+    name = Column(String)
+    description = Column(Text, nullable=True)
+    comment = Column(String, nullable=True)
+    start_datetime = Column(DateTime, nullable=False)
+    end_datetime = Column(DateTime, nullable=False)
+    participants_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            'ix_active_events_place_id_end_datetime',
+            'place_id', 'end_datetime'),
+        Index('ix_active_events_end_datetime', 'end_datetime'),
+    )
+
+
 User.favorite_places = relationship(
     'Place',
     secondary=place_user_association,
@@ -183,3 +221,43 @@ User.events_participated = relationship(
         secondaryjoin=(event_participants.c.event_id == Event.id),
         back_populates='participants',
     )
+
+
+class OsmNode(Base):
+    """Модель заведения из выгрузки OpenStreetMap."""
+    __tablename__ = 'osm_nodes'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    amenity = Column(String, nullable=False)
+    name = Column(String, index=True, nullable=True)
+    tags = Column(JSON, nullable=False, default=dict)
+
+    __table_args__ = (
+        Index('ix_osm_nodes_latitude_longitude', 'latitude', 'longitude'),
+    )
+
+
+class RegionBoundingBox(Base):
+    """Модель границ координат региона из Nominatim."""
+    __tablename__ = 'region_bounding_boxes'
+
+    id = Column(Integer, primary_key=True, index=True)
+    region_name = Column(String, unique=True, index=True, nullable=False)
+    south = Column(Float, nullable=False)
+    north = Column(Float, nullable=False)
+    west = Column(Float, nullable=False)
+    east = Column(Float, nullable=False)
+    modified_date = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now())
+
+
+class CacheVersion(Base):
+    """Модель версии закэшированной таблицы."""
+    __tablename__ = 'cache_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
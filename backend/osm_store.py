@@ -0,0 +1,286 @@
+import argparse
+import json
+import math
+import xml.etree.ElementTree as ElementTree
+from typing import Iterator, Optional, Union, Any
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from database import AsyncSessionLocal, SessionLocal
+from geo import EARTH_RADIUS, get_distance
+from get_osm_response import (SEARCH_LIMIT, SUSTENANCE_AMENITIES,
+                              get_region_boundingbox)
+from metrics import track_osm_call
+from models import OsmNode
+from spatial_index import GridIndex
+
+IMPORT_BATCH_SIZE = 1000
+MAX_NODE_ID = 2 ** 63 - 1
+node_index = GridIndex()
+
+
+def read_overpass_json(path: str) -> Iterator[dict]:
+    """Чтение узлов из json выгрузки overpass-api.de."""
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    for element in data.get('elements', []):
+        if element.get('type', 'node') == 'node':
+            yield element
+
+
+def read_osm_xml(path: str) -> Iterator[dict]:
+    """Чтение узлов из xml выгрузки OpenStreetMap.
+
+    Обработанные элементы удаляются из корня, чтобы память
+    не росла с размером выгрузки.
+    """
+    context = ElementTree.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+    for event, item in context:
+        if event != 'end':
+            continue
+        if item.tag == 'node':
+            yield {
+                'id': int(item.get('id')),
+                'lat': float(item.get('lat')),
+                'lon': float(item.get('lon')),
+                'tags': {tag.get('k'): tag.get('v')
+                         for tag in item.iter('tag')},
+            }
+        if item.tag in ('node', 'way', 'relation'):
+            root.clear()
+
+
+def node_to_row(node: dict) -> Union[dict, None]:
+    """Преобразование узла в строку таблицы, если это заведение."""
+    tags = node.get('tags', {})
+    if tags.get('amenity') not in SUSTENANCE_AMENITIES:
+        return None
+    return {
+        'id': node['id'],
+        'latitude': node['lat'],
+        'longitude': node['lon'],
+        'amenity': tags['amenity'],
+        'name': tags.get('name'),
+        'tags': tags,
+    }
+
+
+def import_nodes(nodes: Iterator[dict], full_refresh: bool = False) -> int:
+    """Загрузка заведений в таблицу osm_nodes пакетами.
+
+    При full_refresh в той же транзакции удаляются заведения,
+    которых нет в новой выгрузке: закрытые или с другим amenity.
+    """
+    imported = 0
+    db = SessionLocal()
+    try:
+        if full_refresh:
+            db.execute(text(
+                'CREATE TEMPORARY TABLE osm_import_ids '
+                '(id BIGINT PRIMARY KEY) ON COMMIT DROP'))
+        batch = []
+        for node in nodes:
+            row = node_to_row(node)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += upsert_rows(db, batch, full_refresh)
+                batch = []
+        if batch:
+            imported += upsert_rows(db, batch, full_refresh)
+        if full_refresh:
+            db.execute(text(
+                'DELETE FROM osm_nodes WHERE NOT EXISTS '
+                '(SELECT 1 FROM osm_import_ids '
+                'WHERE osm_import_ids.id = osm_nodes.id)'))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return imported
+
+
+def upsert_rows(db, rows: list[dict], track_ids: bool = False) -> int:
+    """Вставка или обновление пакета узлов."""
+    if track_ids:
+        db.execute(
+            text('INSERT INTO osm_import_ids (id) VALUES (:id) '
+                 'ON CONFLICT DO NOTHING'),
+            [{'id': row['id']} for row in rows])
+    statement = insert(OsmNode).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[OsmNode.id],
+        set_={
+            'latitude': statement.excluded.latitude,
+            'longitude': statement.excluded.longitude,
+            'amenity': statement.excluded.amenity,
+            'name': statement.excluded.name,
+            'tags': statement.excluded.tags,
+        })
+    db.execute(statement)
+    return len(rows)
+
+
+def parse_node_id(place_id: str) -> Optional[int]:
+    """Id узла OpenStreetMap из id места или None."""
+    try:
+        node_id = int(place_id)
+    except (TypeError, ValueError):
+        return None
+    return node_id if 0 < node_id <= MAX_NODE_ID else None
+
+
+def node_to_element(node: OsmNode) -> dict:
+    """Узел в формате ответа overpass-api.de."""
+    return {
+        'type': 'node',
+        'id': node.id,
+        'lat': node.latitude,
+        'lon': node.longitude,
+        'tags': node.tags,
+    }
+
+
+def build_response(nodes: list[OsmNode]) -> dict:
+    """Ответ в формате overpass-api.de."""
+    return build_index_response([node_to_element(node) for node in nodes])
+
+
+def build_index_response(elements: list[dict]) -> dict:
+    """Ответ в формате overpass-api.de из копий узлов индекса."""
+    return {
+        'version': 0.6,
+        'generator': 'osm_store',
+        'elements': [dict(element) for element in elements],
+    }
+
+
+async def load_node_index() -> int:
+    """Загрузка всех заведений из таблицы в пространственный индекс."""
+    node_index.clear()
+    async with AsyncSessionLocal() as db:
+        nodes = await db.stream_scalars(select(OsmNode))
+        async for node in nodes:
+            node_index.insert(
+                node.id, node.latitude, node.longitude,
+                node_to_element(node))
+    return len(node_index)
+
+
+@track_osm_call
+async def get_sustenance_by_position(
+        latitude: float,
+        longitude: float,
+        around: int) -> Union[dict, Any]:
+    """Запрос мест по координатом и радиусу из локальной таблицы."""
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except ValueError:
+        return {'error': 'Invalid coordinates'}
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return {'error': 'Invalid coordinates'}
+    if len(node_index):
+        return build_index_response(
+            node_index.radius(latitude, longitude, around))
+
+    delta_latitude = math.degrees(around / EARTH_RADIUS)
+    delta_longitude = delta_latitude / max(
+        math.cos(math.radians(latitude)), 1e-6)
+
+    async with AsyncSessionLocal() as db:
+        nodes = (await db.execute(
+            select(OsmNode).filter(
+                OsmNode.latitude.between(
+                    latitude - delta_latitude, latitude + delta_latitude),
+                OsmNode.longitude.between(
+                    longitude - delta_longitude, longitude + delta_longitude))
+        )).scalars().all()
+
+    return build_response([
+        node for node in nodes
+        if get_distance(
+            latitude, longitude, node.latitude, node.longitude) <= around])
+
+
+@track_osm_call
+async def get_places_by_id(place_ids: list[str]) -> Union[dict, Any]:
+    """Запрос списка мест по списку id из локальной таблицы.
+
+    Id, которые не могут быть id узла, пропускаются.
+    """
+    node_ids = [
+        node_id for node_id in map(parse_node_id, place_ids)
+        if node_id is not None]
+    if len(node_index):
+        return build_index_response([
+            node_index.get(node_id) for node_id in node_ids
+            if node_id in node_index])
+
+    async with AsyncSessionLocal() as db:
+        nodes = (await db.execute(
+            select(OsmNode).filter(OsmNode.id.in_(node_ids))
+        )).scalars().all()
+    return build_response(nodes)
+
+
+@track_osm_call
+async def get_search_by_name(
+        region_name: str,
+        place_name: str) -> Union[dict, Any]:
+    """Запрос места по названию в границах региона из локальной таблицы."""
+    boundingbox = await get_region_boundingbox(region_name)
+    if boundingbox is None:
+        return {'error': 'Failed to get the region'}
+    south, north, west, east = boundingbox
+    if len(node_index):
+        return build_index_response([
+            element for element in node_index.bbox(south, west, north, east)
+            if element['tags'].get('name') == place_name][:SEARCH_LIMIT])
+
+    async with AsyncSessionLocal() as db:
+        nodes = (await db.execute(
+            select(OsmNode).filter(
+                OsmNode.name == place_name,
+                OsmNode.latitude.between(south, north),
+                OsmNode.longitude.between(west, east))
+            .limit(SEARCH_LIMIT)
+        )).scalars().all()
+    return build_response(nodes)
+
+
+@track_osm_call
+async def get_place_by_id(place_id: str) -> Union[dict, Any]:
+    """Запрос места по id места из локальной таблицы."""
+    node_id = parse_node_id(place_id)
+    if node_id is None:
+        return {'error': 'Place not found'}
+    if node_id in node_index:
+        return build_index_response([node_index.get(node_id)])
+
+    async with AsyncSessionLocal() as db:
+        node = await db.get(OsmNode, node_id)
+    if node is None:
+        return {'error': 'Place not found'}
+    return build_response([node])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Загрузка заведений из выгрузки OpenStreetMap.')
+    parser.add_argument('path', help='Файл .osm (xml) или .json (overpass)')
+    parser.add_argument(
+        '--full-refresh', action='store_true',
+        help='Удалить заведения, которых нет в выгрузке')
+    args = parser.parse_args()
+
+    if args.path.endswith('.json'):
+        nodes = read_overpass_json(args.path)
+    else:
+        nodes = read_osm_xml(args.path)
+    print(f'Загружено заведений: {import_nodes(nodes, args.full_refresh)}')
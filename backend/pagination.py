@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, desc, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+MAX_INT = 2 ** 31 - 1
+MAX_BIGINT = 2 ** 63 - 1
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Непрозрачный курсор из значений ключа сортировки."""
+    data = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_value(column, value: Any) -> Any:
+    """Значение ключа из курсора с проверкой типа колонки."""
+    python_type = column.type.python_type
+    if python_type is int:
+        limit = MAX_BIGINT if isinstance(column.type, BigInteger) else MAX_INT
+        if type(value) is not int or not -limit <= value <= limit:
+            raise ValueError
+        return value
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.fromisoformat(value)
+    if python_type is str and isinstance(value, str):
+        return value
+    raise ValueError
+
+
+def decode_cursor(cursor: str, columns: list) -> list[Any]:
+    """Значения ключа сортировки из курсора.
+
+    Каждое значение приводится к типу своей колонки, курсор с чужими
+    типами (bool, float, списки, объекты) отклоняется с ответом 400.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            decode_value(column, value)
+            for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail='Неверный курсор')
+
+
+def page_query(
+        statement: Select,
+        columns: list,
+        after: Optional[str],
+        limit: int,
+        descending: bool = False) -> Select:
+    """Запрос страницы после курсора с одной лишней строкой."""
+    if after is not None:
+        key = tuple_(*columns)
+        cursor = tuple_(*decode_cursor(after, columns))
+        statement = statement.filter(
+            key < cursor if descending else key > cursor)
+    ordering = [desc(column) if descending else column for column in columns]
+    return statement.order_by(*ordering).limit(limit + 1)
+
+
+async def fetch_page(
+        db: AsyncSession,
+        statement: Select,
+        columns: list,
+        after: Optional[str],
+        limit: int,
+        descending: bool = False) -> tuple[list, Optional[str]]:
+    """Страница объектов после курсора и курсор следующей страницы."""
+    items = (await db.execute(page_query(
+        statement, columns, after, limit, descending))).scalars().all()
+
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(
+        [getattr(items[-1], column.key) for column in columns])
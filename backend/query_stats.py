@@ -0,0 +1,130 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import QUERY_BUDGET
+
+logger = logging.getLogger('backend_main_logger')
+
+QUERY_COUNT_HEADER = 'X-DB-Query-Count'
+QUERY_TIME_HEADER = 'X-DB-Time-Ms'
+
+
+class QueryStats:
+    """Число запросов к базе и суммарное время их выполнения."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    'current_query_stats', default=None)
+# Счетчики count_queries учитывают запросы из любых потоков и задач.
+global_query_stats: list[QueryStats] = []
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.add(duration)
+    for stats in global_query_stats:
+        stats.add(duration)
+
+
+def install_query_listeners(engine: Engine) -> None:
+    """Подключение счетчика запросов к движку sqlalchemy."""
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Счетчик запросов текущей задачи asyncio и ее дочерних задач."""
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Счетчик всех запросов к базе внутри блока."""
+    stats = QueryStats()
+    global_query_stats.append(stats)
+    try:
+        yield stats
+    finally:
+        global_query_stats.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """Проверка в тестах, что вызов эндпоинта укладывается в max_queries.
+
+    with assert_max_queries(3):
+        client.get('/locations/', params=params)
+    """
+    with count_queries() as stats:
+        yield stats
+    assert stats.count <= max_queries, (
+        f'Выполнено {stats.count} запросов к базе, '
+        f'допустимо не больше {max_queries}')
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware с учетом запросов к базе на каждый запрос к API.
+
+    В режиме debug число запросов и время в базе отдаются в заголовках,
+    запросы сверх QUERY_BUDGET записываются в лог. Заголовки потокового
+    ответа учитывают только запросы, выполненные до начала ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        debug = scope['app'].debug
+
+        async def send_with_headers(message):
+            if debug and message['type'] == 'http.response.start':
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (QUERY_COUNT_HEADER.lower().encode(),
+                     str(stats.count).encode()),
+                    (QUERY_TIME_HEADER.lower().encode(),
+                     f'{stats.duration * 1000:.2f}'.encode()),
+                ]
+            await send(message)
+
+        with track_queries() as stats:
+            await self.app(scope, receive, send_with_headers)
+
+        if stats.count > QUERY_BUDGET:
+            logger.warning(
+                f'{scope["method"]} {scope["path"]}: '
+                f'{stats.count} запросов к базе за '
+                f'{stats.duration * 1000:.1f} ms, '
+                f'бюджет {QUERY_BUDGET}')
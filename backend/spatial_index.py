@@ -0,0 +1,110 @@
+import math
+from typing import Any, Hashable, Iterator
+
+from geo import EARTH_RADIUS, get_distance
+
+
+class GridIndex:
+    """Пространственный индекс точек по ячейкам сетки в градусах."""
+
+    def __init__(self, cell_size: float = 0.01):
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], dict[Hashable, tuple]] = {}
+        self._points: dict[Hashable, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def get_cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        """Ячейка сетки, в которую попадают координаты."""
+        return (math.floor(latitude / self.cell_size),
+                math.floor(longitude / self.cell_size))
+
+    def get(self, key: Hashable) -> Any:
+        """Объект точки по ключу или None."""
+        cell = self._points.get(key)
+        if cell is None:
+            return None
+        return self._cells[cell][key][2]
+
+    def insert(
+            self,
+            key: Hashable,
+            latitude: float,
+            longitude: float,
+            item: Any = None) -> None:
+        """Добавление или перемещение точки."""
+        self.remove(key)
+        cell = self.get_cell(latitude, longitude)
+        self._cells.setdefault(cell, {})[key] = (latitude, longitude, item)
+        self._points[key] = cell
+
+    def remove(self, key: Hashable) -> None:
+        """Удаление точки, если она есть в индексе."""
+        cell = self._points.pop(key, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def clear(self) -> None:
+        """Очистка индекса."""
+        self._cells.clear()
+        self._points.clear()
+
+    def bbox(
+            self,
+            south: float,
+            west: float,
+            north: float,
+            east: float) -> list[Any]:
+        """Точки внутри прямоугольника координат."""
+        return [
+            item for latitude, longitude, item
+            in self._iter_points(south, west, north, east)
+            if south <= latitude <= north and west <= longitude <= east]
+
+    def radius(
+            self,
+            latitude: float,
+            longitude: float,
+            around: float) -> list[Any]:
+        """Точки на расстоянии не больше around метров."""
+        delta_latitude = math.degrees(around / EARTH_RADIUS)
+        delta_longitude = delta_latitude / max(
+            math.cos(math.radians(latitude)), 1e-6)
+        return [
+            item for point_latitude, point_longitude, item
+            in self._iter_points(
+                latitude - delta_latitude, longitude - delta_longitude,
+                latitude + delta_latitude, longitude + delta_longitude)
+            if get_distance(
+                latitude, longitude,
+                point_latitude, point_longitude) <= around]
+
+    def _iter_points(
+            self,
+            south: float,
+            west: float,
+            north: float,
+            east: float) -> Iterator[tuple]:
+        south_cell, west_cell = self.get_cell(south, west)
+        north_cell, east_cell = self.get_cell(north, east)
+        cells_count = ((north_cell - south_cell + 1)
+                       * (east_cell - west_cell + 1))
+        if cells_count > len(self._cells):
+            for (latitude_cell, longitude_cell), bucket in self._cells.items():
+                if (south_cell <= latitude_cell <= north_cell
+                        and west_cell <= longitude_cell <= east_cell):
+                    yield from bucket.values()
+            return
+        for latitude_cell in range(south_cell, north_cell + 1):
+            for longitude_cell in range(west_cell, east_cell + 1):
+                bucket = self._cells.get((latitude_cell, longitude_cell))
+                if bucket:
+                    yield from bucket.values()